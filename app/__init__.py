@@ -16,9 +16,15 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)
 
-    # Initialize APScheduler with persistent job store
+    # Initialize APScheduler with persistent job store. Every server worker starts
+    # it paused; only the one elected through the scheduler lease runs the jobs.
     sc.init_app(app)
-    sc.start()
+    if app.config["SCHEDULER_ENABLED"]:
+        sc.start(paused=True)
+        if sc.running:
+            from .leader import SchedulerLeader
+
+            SchedulerLeader(app, sc, app.config["SCHEDULER_LEASE_SECONDS"]).start()
 
     # Register authentication blueprint
     from .auth import auth_bp
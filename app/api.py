@@ -1,9 +1,19 @@
+import json
 import threading
+import time
 
-from flask import Blueprint, request, jsonify
-from app import db
+from flask import Blueprint, Response, current_app, request, jsonify
+from app import db, jobs, progress
 from app.models import FitnessCategory, Mapping
-from app.logger import add_log, clear_logs, get_logs
+from app.store import SharedDict
+from app.logger import (
+    add_log,
+    clear_logs,
+    get_last_seq,
+    get_logs,
+    get_logs_since,
+    wait_for_logs,
+)
 from app.services.emag_full_seq import (
     fetch_all_emag_products,
     fetch_all_fitness1_products,
@@ -18,45 +28,53 @@ from app.services.emag_full_seq import (
     run_update_status_romania_process,
     run_update_price_romania_process,
     run_update_combined_process,
+    run_update_all_markets_process,
 )
-from app.services import const
+from app.services import category_cache, const
 from app.services import util
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 
-# Simple global variable to track update job status
-update_job_status = {"running": False, "last_message": "No update run yet."}
+# Update job status, shared by every worker process through the state database
+update_job_status = SharedDict(
+    "update_job_status", {"last_message": "No update run yet."}
+)
+
+# Idle /api/events streams send a comment this often so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
 
 
 @api_bp.route("/create", methods=["POST"])
 def api_create():
     """
     Endpoint to trigger the product creation process.
-    Accepts a JSON payload with optional parameters: 'pause' and 'batch_size'.
+    Accepts a JSON payload with the optional parameter 'batch_size'.
     """
     data = request.get_json() or {}
-    pause = data.get("pause", 1)
     batch_size = data.get("batch_size", 50)
 
     add_log("API /create endpoint called.")
     result = {}
+    app = current_app._get_current_object()
 
     def run_create():
-        try:
-            add_log("Starting product creation process...")
-            # Call our refactored create function.
-            summary = run_create_process(pause=pause, batch_size=batch_size)
-            add_log("Product creation process completed successfully.")
-            result.update(
-                {
-                    "status": "success",
-                    "message": "Product creation process executed.",
-                    "summary": summary,
-                }
-            )
-        except Exception as e:
-            add_log(f"Error in product creation process: {str(e)}")
-            result.update({"status": "error", "message": str(e)})
+        # The id allocator needs the database, so run inside an app context
+        with app.app_context():
+            try:
+                add_log("Starting product creation process...")
+                # Call our refactored create function.
+                summary = run_create_process(batch_size=batch_size)
+                add_log("Product creation process completed successfully.")
+                result.update(
+                    {
+                        "status": "success",
+                        "message": "Product creation process executed.",
+                        "summary": summary,
+                    }
+                )
+            except Exception as e:
+                add_log(f"Error in product creation process: {str(e)}")
+                result.update({"status": "error", "message": str(e)})
 
     # Run the create process in a thread so the API remains responsive.
     create_thread = threading.Thread(target=run_create)
@@ -66,198 +84,94 @@ def api_create():
     return jsonify(result)
 
 
-@api_bp.route("/update", methods=["POST"])
-def api_update():
+def _start_update_job(endpoint, job_type, markets, mode, update_func):
     """
-    Starts the product update process in a background thread.
+    Registers an update run in the job registry and starts `update_func` in a
+    background thread. A trigger for work that is already running is coalesced
+    into that run; a trigger that only partly overlaps a running job is refused.
     """
-    global update_job_status
-
     data = request.get_json() or {}
-    pause = data.get("pause", 1)
     batch_size = data.get("batch_size", 50)
 
-    add_log("API /update endpoint called.")
+    add_log(f"API {endpoint} endpoint called.")
 
     def background_update():
         global update_job_status
         try:
-            update_job_status["running"] = True
             update_job_status["last_message"] = "Update process started."
 
-            summary = run_update_process(pause=pause, batch_size=batch_size)
+            summary = update_func(batch_size=batch_size)
 
-            update_job_status["running"] = False
             update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
+                f"Update completed. {summary.get('updated_entries', 0)} entries updated."
             )
             add_log(f"Background update finished. Summary: {summary}")
+            return summary
 
         except Exception as e:
-            update_job_status["running"] = False
             update_job_status["last_message"] = f"Update failed: {str(e)}"
             add_log(f"Error during background update: {str(e)}")
+            raise
 
     try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
-
+        run_id, created = jobs.submit(job_type, markets, mode, background_update)
+    except jobs.JobConflict as e:
+        add_log(f"{endpoint} refused: {e}")
         return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
+            jsonify({"status": "error", "message": str(e), "run_ids": e.run_ids}),
+            409,
         )
     except Exception as e:
         add_log(f"Error launching background update: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+    return (
+        jsonify(
+            {
+                "status": "success",
+                "message": (
+                    "Update process started in background."
+                    if created
+                    else "Update process is already running."
+                ),
+                "run_id": run_id,
+                "coalesced": not created,
+            }
+        ),
+        202,
+    )
 
-@api_bp.route("/update-status", methods=["POST"])
-def api_update_status_only():
-    """Starts the product status update process in a background thread."""
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update-status endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_status_process(pause=pause, batch_size=batch_size)
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
 
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
+@api_bp.route("/update", methods=["POST"])
+def api_update():
+    """
+    Starts the product update process in a background thread.
+    """
+    return _start_update_job("/update", "update", ["bg"], "both", run_update_process)
 
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
 
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+@api_bp.route("/update-status", methods=["POST"])
+def api_update_status_only():
+    """Starts the product status update process in a background thread."""
+    return _start_update_job(
+        "/update-status", "update-status", ["bg"], "status", run_update_status_process
+    )
 
 
 @api_bp.route("/update-price", methods=["POST"])
 def api_update_price_only():
     """Starts the product price update process in a background thread."""
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update-price endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_price_process(pause=pause, batch_size=batch_size)
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
-
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
-
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _start_update_job(
+        "/update-price", "update-price", ["bg"], "price", run_update_price_process
+    )
 
 
 @api_bp.route("/update-both", methods=["POST"])
 def api_update_both():
     """Starts the combined price and status update process."""
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update-both endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_combined_process(pause=pause, batch_size=batch_size)
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
-
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
-
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _start_update_job(
+        "/update-both", "update-both", ["bg"], "both", run_update_combined_process
+    )
 
 
 @api_bp.route("/update/status", methods=["GET"])
@@ -265,17 +179,103 @@ def api_update_status():
     """
     Returns the current status of the update process.
     """
-    global update_job_status
-    return jsonify(update_job_status)
+    running = jobs.running()
+    return jsonify(dict(update_job_status, running=bool(running), jobs=running))
+
+
+@api_bp.route("/jobs", methods=["GET"])
+def api_jobs():
+    """
+    Returns the most recent update runs, newest first.
+    Accepts the optional query parameter 'limit' (default 50).
+    """
+    return jsonify(jobs.recent(request.args.get("limit", default=50, type=int)))
+
+
+@api_bp.route("/jobs/<run_id>", methods=["GET"])
+def api_job(run_id):
+    """Returns the record of one update run."""
+    record = jobs.get(run_id)
+    if record is None:
+        return jsonify({"status": "error", "message": "Run not found."}), 404
+    return jsonify(record)
 
 
 @api_bp.route("/logs", methods=["GET"])
 def api_logs():
     """
     Returns the in-memory logs as a JSON response.
+    With ?since=<seq>, only the entries after that sequence number are returned;
+    pass the returned last_seq as the next cursor.
     """
-    logs = get_logs()
-    return jsonify({"logs": logs})
+    since = request.args.get("since", type=int)
+    if since is None:
+        return jsonify({"logs": get_logs(), "last_seq": get_last_seq()})
+
+    entries = get_logs_since(since)
+    return jsonify(
+        {
+            "logs": [message for _, message in entries],
+            "last_seq": entries[-1][0] if entries else max(since, get_last_seq()),
+        }
+    )
+
+
+def _sse(event: str, data, event_id: int = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@api_bp.route("/events", methods=["GET"])
+def api_events():
+    """
+    Server-Sent Events stream of new log lines ("log" events, id = log sequence
+    number) and of the update job status and per-market progress ("status" events,
+    sent whenever they change). Reconnecting clients resume from Last-Event-ID.
+    """
+    since = request.args.get("since", type=int)
+    if since is None:
+        since = request.headers.get("Last-Event-ID", default=0, type=int)
+
+    def stream():
+        cursor = since
+        last_status = None
+        last_sent = time.monotonic()
+        yield "retry: 3000\n\n"
+        while True:
+            for seq, message in get_logs_since(cursor):
+                cursor = seq
+                last_sent = time.monotonic()
+                yield _sse("log", message, event_id=seq)
+
+            running = jobs.running()
+            status = dict(
+                update_job_status,
+                running=bool(running),
+                jobs=running,
+                progress=progress.get_progress(),
+            )
+            if status != last_status:
+                last_status = status
+                last_sent = time.monotonic()
+                yield _sse("status", status)
+
+            if time.monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            # Returns as soon as a new line is logged; the timeout bounds how late
+            # a progress change without an accompanying log line is pushed
+            wait_for_logs(cursor, timeout=1.0)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @api_bp.route("/logs/clear", methods=["POST"])
@@ -301,7 +301,7 @@ def api_get_emag_products():
             base_url=const.EMAG_URL, resource="product_offer", action="read"
         ),
         headers=const.EMAG_HEADERS,
-        pause=1,
+        concurrent=True,
     )
     return jsonify({"products": products})
 
@@ -358,154 +358,51 @@ def api_get_categories():
     return jsonify({"categories": [cat.as_dict() for cat in categories]})
 
 
+@api_bp.route("/categories/cache/clear", methods=["POST"])
+def api_clear_categories_cache():
+    # Optional body: {"marketplace": "ro", "category_ids": [2735, ...]}
+    data = request.get_json(silent=True) or {}
+    removed = category_cache.invalidate(
+        marketplace=data.get("marketplace"),
+        categories_list=data.get("category_ids"),
+    )
+    return jsonify(
+        {"status": "success", "message": f"Removed {removed} cached categories."}
+    )
+
+
 @api_bp.route("/update/ro", methods=["POST"])
 def api_update_romania_products():
     """
     Starts the product update process in a background thread.
     """
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update/ro endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_romania_process(pause=pause, batch_size=batch_size)
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
-
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
-
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _start_update_job(
+        "/update/ro", "update", ["ro"], "both", run_update_romania_process
+    )
 
 
 @api_bp.route("/update/ro/status", methods=["POST"])
 def api_update_romania_status():
     """Starts the Romania product status update process in a background thread."""
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update/ro/status endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_status_romania_process(
-                pause=pause, batch_size=batch_size
-            )
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
-
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
-
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _start_update_job(
+        "/update/ro/status",
+        "update-status",
+        ["ro"],
+        "status",
+        run_update_status_romania_process,
+    )
 
 
 @api_bp.route("/update/ro/price", methods=["POST"])
 def api_update_romania_price():
     """Starts the Romania product price update process in a background thread."""
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update/ro/price endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_price_romania_process(
-                pause=pause, batch_size=batch_size
-            )
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
-
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
-
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _start_update_job(
+        "/update/ro/price",
+        "update-price",
+        ["ro"],
+        "price",
+        run_update_price_romania_process,
+    )
 
 
 @api_bp.route("/update/hu", methods=["POST"])
@@ -513,146 +410,45 @@ def api_update_hungary_products():
     """
     Starts the product update process in a background thread.
     """
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update/hu endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_hungarian_process(pause=pause, batch_size=batch_size)
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
-
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
-
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _start_update_job(
+        "/update/hu", "update", ["hu"], "both", run_update_hungarian_process
+    )
 
 
 @api_bp.route("/update/hu/status", methods=["POST"])
 def api_update_hungary_status():
     """Starts the Hungary product status update process in a background thread."""
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update/hu/status endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_status_hungarian_process(
-                pause=pause, batch_size=batch_size
-            )
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
-
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
-
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
-
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return _start_update_job(
+        "/update/hu/status",
+        "update-status",
+        ["hu"],
+        "status",
+        run_update_status_hungarian_process,
+    )
 
 
 @api_bp.route("/update/hu/price", methods=["POST"])
 def api_update_hungary_price():
     """Starts the Hungary product price update process in a background thread."""
-    global update_job_status
-
-    data = request.get_json() or {}
-    pause = data.get("pause", 1)
-    batch_size = data.get("batch_size", 50)
-
-    add_log("API /update/hu/price endpoint called.")
-
-    def background_update():
-        global update_job_status
-        try:
-            update_job_status["running"] = True
-            update_job_status["last_message"] = "Update process started."
-
-            summary = run_update_price_hungarian_process(
-                pause=pause, batch_size=batch_size
-            )
-
-            update_job_status["running"] = False
-            update_job_status["last_message"] = (
-                f"Update completed. {summary['updated_entries']} entries updated."
-            )
-            add_log(f"Background update finished. Summary: {summary}")
-
-        except Exception as e:
-            update_job_status["running"] = False
-            update_job_status["last_message"] = f"Update failed: {str(e)}"
-            add_log(f"Error during background update: {str(e)}")
+    return _start_update_job(
+        "/update/hu/price",
+        "update-price",
+        ["hu"],
+        "price",
+        run_update_price_hungarian_process,
+    )
 
-    try:
-        thread = threading.Thread(target=background_update)
-        thread.start()
 
-        return (
-            jsonify(
-                {
-                    "status": "success",
-                    "message": "Update process started in background.",
-                }
-            ),
-            202,
-        )
-    except Exception as e:
-        add_log(f"Error launching background update: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+@api_bp.route("/update/all", methods=["POST"])
+def api_update_all_markets():
+    """
+    Starts the price and status update for all marketplaces in a background thread.
+    Fitness1 is fetched once and the bg/ro/hu offer streams run at the same time.
+    """
+    return _start_update_job(
+        "/update/all",
+        "update-all",
+        ["bg", "ro", "hu"],
+        "both",
+        run_update_all_markets_process,
+    )
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from app import progress, store
+from app.logger import add_log
+
+# A running job that has not sent a heartbeat for this long is considered dead
+# and no longer blocks new runs of the same market and mode
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS") or "600")
+HEARTBEAT_SECONDS = 30
+
+# Fields each update mode writes; a "both" run covers "price" and "status" runs
+_MODE_PARTS = {"both": ("price", "status"), "price": ("price",), "status": ("status",)}
+
+_COLUMNS = (
+    "run_id",
+    "job_type",
+    "markets",
+    "mode",
+    "trigger",
+    "status",
+    "started_at",
+    "heartbeat_at",
+    "finished_at",
+    "counters",
+    "summary",
+    "error",
+)
+_JSON_COLUMNS = ("markets", "counters", "summary")
+
+
+class JobConflict(Exception):
+    """Raised when a job overlaps a running job that does not cover all of its work."""
+
+    def __init__(self, run_ids):
+        self.run_ids = sorted(run_ids)
+        super().__init__(f"Conflicting job(s) running: {', '.join(self.run_ids)}")
+
+
+def _lock_keys(markets, mode) -> list:
+    return [f"{market}:{part}" for market in markets for part in _MODE_PARTS[mode]]
+
+
+def _row_to_dict(row) -> dict:
+    record = dict(zip(_COLUMNS, row))
+    for column in _JSON_COLUMNS:
+        if record[column] is not None:
+            record[column] = json.loads(record[column])
+    return record
+
+
+def _summarize(summary):
+    """Keeps scalar results and replaces lists (e.g. failed batches) by their length."""
+    if not isinstance(summary, dict):
+        return summary
+    return {
+        key: len(value) if isinstance(value, list) else _summarize(value)
+        for key, value in summary.items()
+    }
+
+
+def start(job_type: str, markets: list, mode: str, trigger: str = "api"):
+    """
+    Registers a new run unless the same work is already running.
+
+    Every run holds one lock per (market, update part). If all of those locks are
+    held by a single live run, that run already does this work and its run id is
+    returned instead (the trigger is coalesced). Partial overlaps raise JobConflict.
+
+    Returns:
+        tuple: (run_id, created) where created is False for a coalesced trigger.
+    """
+    keys = _lock_keys(markets, mode)
+    now = time.time()
+    with store.transaction() as conn:
+        placeholders = ", ".join("?" for _ in keys)
+        holders = conn.execute(
+            "SELECT l.lock_key, l.run_id FROM job_locks l JOIN jobs j ON j.run_id = l.run_id "
+            f"WHERE l.lock_key IN ({placeholders}) AND j.status = 'running' "
+            "AND j.heartbeat_at >= ?",
+            (*keys, now - JOB_STALE_SECONDS),
+        ).fetchall()
+        if holders:
+            run_ids = {run_id for _, run_id in holders}
+            if len(holders) == len(keys) and len(run_ids) == 1:
+                return run_ids.pop(), False
+            raise JobConflict(run_ids)
+
+        run_id = uuid.uuid4().hex[:12]
+        conn.execute(
+            "INSERT INTO jobs (run_id, job_type, markets, mode, trigger, status, "
+            "started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?, 'running', ?, ?)",
+            (run_id, job_type, json.dumps(list(markets)), mode, trigger, now, now),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO job_locks (lock_key, run_id) VALUES (?, ?)",
+            [(key, run_id) for key in keys],
+        )
+    return run_id, True
+
+
+def heartbeat(run_id: str):
+    store.connect().execute(
+        "UPDATE jobs SET heartbeat_at = ? WHERE run_id = ?", (time.time(), run_id)
+    )
+
+
+def finish(run_id: str, summary=None, error: str = None):
+    """Records the outcome of a run, snapshots its per-market counters and frees its locks."""
+    record = get(run_id)
+    current = progress.get_progress()
+    counters = {market: current.get(market, {}) for market in record["markets"]}
+    with store.transaction() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, heartbeat_at = ?, "
+            "counters = ?, summary = ?, error = ? WHERE run_id = ?",
+            (
+                "failed" if error else "success",
+                time.time(),
+                time.time(),
+                json.dumps(counters, default=str),
+                json.dumps(_summarize(summary), default=str),
+                error,
+                run_id,
+            ),
+        )
+        conn.execute("DELETE FROM job_locks WHERE run_id = ?", (run_id,))
+
+
+def get(run_id: str):
+    """Returns the record of a run, or None if it does not exist."""
+    row = (
+        store.connect()
+        .execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE run_id = ?", (run_id,))
+        .fetchone()
+    )
+    return _row_to_dict(row) if row else None
+
+
+def recent(limit: int = 50) -> list:
+    """Returns the most recent runs, newest first."""
+    rows = store.connect().execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY started_at DESC LIMIT ?",
+        (limit,),
+    )
+    return [_row_to_dict(row) for row in rows]
+
+
+def running() -> list:
+    """Returns the live runs (running and with a recent heartbeat)."""
+    rows = store.connect().execute(
+        f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = 'running' "
+        "AND heartbeat_at >= ? ORDER BY started_at",
+        (time.time() - JOB_STALE_SECONDS,),
+    )
+    return [_row_to_dict(row) for row in rows]
+
+
+def execute(run_id: str, func):
+    """
+    Runs `func()` as the body of run `run_id`: sends heartbeats while it runs and
+    records its summary or error when it ends. Returns the summary.
+    """
+    done = threading.Event()
+
+    def beat():
+        while not done.wait(HEARTBEAT_SECONDS):
+            heartbeat(run_id)
+
+    threading.Thread(target=beat, daemon=True).start()
+    try:
+        summary = func()
+    except Exception as e:
+        done.set()
+        finish(run_id, error=str(e))
+        raise
+    done.set()
+    finish(run_id, summary=summary)
+    return summary
+
+
+def submit(job_type: str, markets: list, mode: str, func, trigger: str = "api"):
+    """
+    Starts `func()` as a new background run, or coalesces into the live run that
+    already does the same work.
+
+    Returns:
+        tuple: (run_id, created), see start(). Raises JobConflict on partial overlaps.
+    """
+    run_id, created = start(job_type, markets, mode, trigger)
+    if not created:
+        add_log(
+            f"{job_type} ({', '.join(markets)}, {mode}) is already running as {run_id}"
+        )
+        return run_id, False
+
+    def target():
+        try:
+            execute(run_id, func)
+        except Exception:
+            # The error is recorded on the run; func reports details itself
+            pass
+
+    threading.Thread(target=target, daemon=True).start()
+    return run_id, True
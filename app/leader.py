@@ -0,0 +1,155 @@
+import atexit
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app import db
+from app.logger import add_log
+from app.models import SchedulerLease
+
+LEASE_NAME = "scheduler"
+
+
+def _now() -> datetime:
+    # Naive UTC like the other DateTime columns; hosts must keep their clocks in sync
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SchedulerLeader:
+    """
+    Elects one process to run the scheduled jobs.
+
+    Every process starts APScheduler paused and competes for a single row of the
+    scheduler_leases table. The holder renews the lease every `lease_seconds / 3`
+    seconds and keeps its scheduler running; the others stay paused and only serve
+    HTTP. If the holder dies, its lease expires after `lease_seconds` and the next
+    process to renew takes over. Acquiring and renewing is one conditional UPDATE,
+    so at most one process holds an unexpired lease.
+
+    Example usage:
+
+    >> sc.start(paused=True)
+    >> SchedulerLeader(app, sc, lease_seconds=60).start()
+    """
+
+    def __init__(self, app, scheduler, lease_seconds: int = 60):
+        self.app = app
+        self.scheduler = scheduler
+        self.lease_seconds = lease_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+        self._stop = threading.Event()
+
+    def _try_acquire(self) -> bool:
+        """Takes or renews the lease. Returns True if this process holds it."""
+        now = _now()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        renewed = db.session.execute(
+            update(SchedulerLease)
+            .where(
+                SchedulerLease.name == LEASE_NAME,
+                or_(
+                    SchedulerLease.holder == self.holder,
+                    SchedulerLease.expires_at < now,
+                ),
+            )
+            .values(holder=self.holder, expires_at=expires_at, renewed_at=now)
+        ).rowcount
+        if renewed:
+            db.session.commit()
+            return True
+
+        db.session.rollback()
+        if db.session.get(SchedulerLease, LEASE_NAME) is not None:
+            # Held by another live process
+            return False
+        db.session.add(
+            SchedulerLease(
+                name=LEASE_NAME,
+                holder=self.holder,
+                expires_at=expires_at,
+                acquired_at=now,
+                renewed_at=now,
+            )
+        )
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Another process created the row first
+            db.session.rollback()
+            return False
+
+    def _release(self):
+        """Expires the lease on shutdown so another process takes over right away."""
+        if not self.is_leader:
+            return
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    update(SchedulerLease)
+                    .where(
+                        SchedulerLease.name == LEASE_NAME,
+                        SchedulerLease.holder == self.holder,
+                    )
+                    .values(expires_at=_now())
+                )
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+
+    def _set_leader(self, is_leader: bool):
+        if is_leader and not self.is_leader:
+            # Mark acquired_at only on a change of holder, not on every renewal
+            db.session.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == LEASE_NAME)
+                .values(acquired_at=_now())
+            )
+            db.session.commit()
+            self.scheduler.resume()
+            add_log(f"Scheduler leadership acquired by {self.holder}")
+        elif not is_leader and self.is_leader:
+            self.scheduler.pause()
+            add_log(f"Scheduler leadership lost by {self.holder}")
+        self.is_leader = is_leader
+
+    def _run(self):
+        while True:
+            with self.app.app_context():
+                try:
+                    self._set_leader(self._try_acquire())
+                except SQLAlchemyError as e:
+                    # Without a renewal the lease may pass to another process,
+                    # so stop running jobs until the database is reachable again
+                    db.session.rollback()
+                    add_log(f"Scheduler lease check failed: {str(e)}")
+                    self._set_leader(False)
+                finally:
+                    db.session.remove()
+            if self.is_leader:
+                # Jobs added by other workers are only seen on the next wakeup
+                self.scheduler.scheduler.wakeup()
+            if self._stop.wait(self.lease_seconds / 3):
+                return
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        self._release()
+
+
+def get_lease():
+    """Returns the current scheduler lease, or None if no process has taken it yet."""
+    lease = db.session.get(SchedulerLease, LEASE_NAME)
+    if lease is None:
+        return None
+    return dict(lease.as_dict(), expired=lease.expires_at < _now())
@@ -1,14 +1,64 @@
-logs = []
+import os
+import sqlite3
+import threading
+
+from app import store
+
+# Only the most recent LOG_CAPACITY messages are kept
+LOG_CAPACITY = int(os.getenv("LOG_CAPACITY") or "5000")
+# Older entries are deleted once every this many messages
+_TRIM_EVERY = 100
+
+# Log entries live in the shared state database (see app.store), so every
+# gunicorn worker serves the same log. seq keeps increasing across clears so
+# that clients polling with ?since=<seq> never miss or repeat an entry.
+
+# Wakes up the streaming clients of this process (see wait_for_logs)
+_new_entry = threading.Condition()
 
 
 def add_log(message):
     print(message)
-    logs.append(message)
+    try:
+        seq = store.append_log(message)
+        if seq % _TRIM_EVERY == 0:
+            store.trim_logs(LOG_CAPACITY)
+    except sqlite3.Error as e:
+        # Never let the log store break the job that is logging
+        print(f"Could not store log message: {e}")
+        return
+    with _new_entry:
+        _new_entry.notify_all()
 
 
 def clear_logs():
-    logs.clear()
+    store.clear_logs()
 
 
 def get_logs():
-    return logs
+    return [message for _, message in get_logs_since(0)]
+
+
+def get_last_seq() -> int:
+    return store.last_log_seq()
+
+
+def get_logs_since(since: int = 0) -> list:
+    """
+    Returns the log entries newer than `since` (at most the last LOG_CAPACITY)
+    as [(seq, message), ...]. The lookup uses the seq primary key, so the cost
+    does not grow with the history.
+    """
+    since = max(since, get_last_seq() - LOG_CAPACITY)
+    return store.logs_since(since)
+
+
+def wait_for_logs(since: int, timeout: float) -> bool:
+    """
+    Blocks until this process logs a new entry or `timeout` seconds pass.
+    Entries written by other workers are picked up when the timeout expires.
+    Returns True if there are entries newer than `since`.
+    """
+    with _new_entry:
+        _new_entry.wait(timeout=timeout)
+    return get_last_seq() > since
@@ -39,3 +39,42 @@ class Mapping(db.Model):
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
+
+
+class ProductIdSequence(db.Model):
+    __tablename__ = "product_id_sequences"
+    marketplace = db.Column(db.String(8), primary_key=True)
+    # The next id that has not been handed out to any process yet
+    next_id = db.Column(db.BigInteger, nullable=False)
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.now(timezone.utc),
+        onupdate=datetime.now(timezone.utc),
+    )
+
+    def as_dict(self):
+        return {
+            "marketplace": self.marketplace,
+            "next_id": self.next_id,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class SchedulerLease(db.Model):
+    __tablename__ = "scheduler_leases"
+    name = db.Column(db.String(64), primary_key=True)
+    # Process that currently runs the scheduled jobs, e.g. "host:pid:token"
+    holder = db.Column(db.String(255), nullable=False)
+    # The holder must renew the lease before this time or another process takes over
+    expires_at = db.Column(db.DateTime, nullable=False)
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    renewed_at = db.Column(db.DateTime, nullable=False)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "holder": self.holder,
+            "expires_at": self.expires_at.isoformat(),
+            "acquired_at": self.acquired_at.isoformat(),
+            "renewed_at": self.renewed_at.isoformat(),
+        }
@@ -0,0 +1,65 @@
+import sqlite3
+import time
+
+from app import store
+
+# Live progress of the running update jobs, keyed by marketplace. Kept in the
+# shared state database so every worker reports the same progress.
+_KEY = "progress"
+
+
+def _update(apply):
+    try:
+        store.update_state(_KEY, apply, {})
+    except sqlite3.Error as e:
+        # Progress is informational; never let it break the job that reports it
+        print(f"Could not store progress: {e}")
+
+
+def start(market: str):
+    """Resets the progress counters of `market` at the start of a run."""
+
+    def apply(progress):
+        progress[market] = {
+            "running": True,
+            "started_at": time.time(),
+            "page": 0,
+            "batches_sent": 0,
+            "entries_sent": 0,
+            "unchanged_entries": 0,
+            "failed_batches": 0,
+        }
+        return progress
+
+    _update(apply)
+
+
+def update(market: str, **fields):
+    """Sets progress fields (e.g. page=3) of `market`."""
+
+    def apply(progress):
+        progress.setdefault(market, {}).update(fields)
+        return progress
+
+    _update(apply)
+
+
+def increment(market: str, **counters):
+    """Adds to progress counters (e.g. batches_sent=1) of `market`."""
+
+    def apply(progress):
+        entry = progress.setdefault(market, {})
+        for name, value in counters.items():
+            entry[name] = entry.get(name, 0) + value
+        return progress
+
+    _update(apply)
+
+
+def finish(market: str):
+    update(market, running=False, finished_at=time.time())
+
+
+def get_progress() -> dict:
+    """Returns a snapshot of the progress of every market."""
+    return store.get_state(_KEY, {})
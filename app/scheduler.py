@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
 
 from flask import Blueprint, request, jsonify
+from app import jobs, leader
 from app.extensions import scheduler  # Import scheduler from extensions
+from app.logger import add_log
 from app.services.emag_full_seq import (
     run_update_process,
 )
@@ -10,9 +12,25 @@ from flask_apscheduler.utils import job_to_dict
 sched_bp = Blueprint("sched", __name__)
 
 
-def update_job():
+def update_job(trigger: str = "scheduler") -> dict:
+    """
+    Runs the update unless an update of the same offers is already in progress.
+
+    Returns:
+        dict: {"outcome": "created" | "coalesced" | "conflict", "run_id": ...}.
+        A conflict carries the conflicting "run_ids" instead of a run id.
+    """
     print("Update job triggered at", datetime.now())
-    run_update_process(pause=1, batch_size=50)
+    try:
+        run_id, created = jobs.start("update", ["bg"], "both", trigger=trigger)
+    except jobs.JobConflict as e:
+        add_log(f"Scheduled update skipped: {e}")
+        return {"outcome": "conflict", "run_id": None, "run_ids": e.run_ids}
+    if not created:
+        add_log(f"Scheduled update skipped: already running as {run_id}")
+        return {"outcome": "coalesced", "run_id": run_id}
+    jobs.execute(run_id, lambda: run_update_process(batch_size=50))
+    return {"outcome": "created", "run_id": run_id}
 
 
 @sched_bp.route("/schedule", methods=["POST"])
@@ -120,12 +138,43 @@ def cancel_job():
         return jsonify({"status": "error", "message": "No job found to cancel"}), 404
 
 
+@sched_bp.route("/leader", methods=["GET"])
+def get_leader():
+    """Returns which process holds the scheduler lease and runs the scheduled jobs."""
+    lease = leader.get_lease()
+    if lease is None:
+        return jsonify({"status": "error", "message": "No scheduler leader yet"}), 404
+    return jsonify({"status": "success", "leader": lease})
+
+
 @sched_bp.route("/trigger", methods=["POST"])
 def trigger_update():
     try:
-        update_job()
-        return jsonify(
-            {"status": "success", "message": "Update process triggered manually"}
-        )
+        result = update_job(trigger="manual")
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
+
+    if result["outcome"] == "conflict":
+        return (
+            jsonify(
+                {
+                    "status": "error",
+                    "message": "Conflicting job(s) running: "
+                    + ", ".join(result["run_ids"]),
+                    "run_ids": result["run_ids"],
+                }
+            ),
+            409,
+        )
+    return jsonify(
+        {
+            "status": "success",
+            "message": (
+                "Update process triggered manually"
+                if result["outcome"] == "created"
+                else "Update process is already running."
+            ),
+            "run_id": result["run_id"],
+            "coalesced": result["outcome"] == "coalesced",
+        }
+    )
@@ -0,0 +1,129 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from app.logger import add_log
+from app.services import client, const
+from app.services.disk_cache import DiskCache
+
+_caches = {}
+
+
+def _marketplace_from_url(api_url: str) -> str:
+    return urlsplit(api_url).netloc.rsplit(".", 1)[-1]
+
+
+def get_cache(marketplace: str) -> DiskCache:
+    """Returns the on-disk category cache of one marketplace."""
+    cache = _caches.get(marketplace)
+    if cache is None:
+        cache = DiskCache(
+            os.path.join(const.CACHE_DIR, "categories", marketplace),
+            ttl=const.CATEGORY_CACHE_TTL_HOURS * 3600,
+        )
+        _caches[marketplace] = cache
+    return cache
+
+
+def _fetch_category(api_url: str, headers: dict, category_id):
+    """
+    Reads a single category (with its characteristics) from eMAG.
+    Returns the list of category objects, or None if the request failed.
+    """
+    response = client.post(api_url, json={"id": category_id}, headers=headers)
+    if response.status_code != 200:
+        add_log(
+            f"Request failed for category {category_id}: HTTP {response.status_code}"
+        )
+        return None
+
+    data = response.json()
+    if data.get("isError", False):
+        add_log(
+            f"API error for category {category_id}: "
+            f"messages={data.get('messages')} errors={data.get('errors')}"
+        )
+        return None
+
+    results = data.get("results", [])
+    if not results:
+        add_log(f"No results for category {category_id}")
+        return None
+    return results
+
+
+def get_categories(
+    api_url: str,
+    headers: dict,
+    categories_list: list,
+    force_refresh=False,
+    max_workers=4,
+) -> dict:
+    """
+    Returns the eMAG category definitions for the given ids, keyed by
+    (marketplace, category_id) in the on-disk cache. Only ids that are not cached
+    (or whose entry is older than CATEGORY_CACHE_TTL_HOURS) are fetched, concurrently.
+
+    Args:
+        api_url (str): The category/read URL of the marketplace.
+        headers (dict): HTTP headers to include with each request.
+        categories_list (list): The category ids to resolve.
+        force_refresh (bool, optional): Ignore cached entries and fetch every id.
+        max_workers (int, optional): Concurrent requests for cache misses.
+
+    Returns:
+        dict: {category_id: [category_dict, ...]} for every id that could be resolved.
+    """
+    marketplace = _marketplace_from_url(api_url)
+    cache = get_cache(marketplace)
+
+    category_ids = list(dict.fromkeys(categories_list))
+    categories = {}
+    misses = []
+    for category_id in category_ids:
+        cached = None if force_refresh else cache.get(str(category_id))
+        if cached is None:
+            misses.append(category_id)
+        else:
+            categories[category_id] = cached
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = executor.map(
+                lambda category_id: _fetch_category(api_url, headers, category_id),
+                misses,
+            )
+            for category_id, results in zip(misses, fetched):
+                if results is None:
+                    continue
+                cache.set(str(category_id), results)
+                categories[category_id] = results
+
+    add_log(
+        f"Resolved {len(categories)} {marketplace} categories "
+        f"({len(category_ids) - len(misses)} cached, {len(misses)} fetched)"
+    )
+    return categories
+
+
+def invalidate(marketplace: str = None, categories_list: list = None) -> int:
+    """
+    Drops cached category definitions so the next run fetches them again.
+
+    Args:
+        marketplace (str, optional): Only invalidate this marketplace. Defaults to all.
+        categories_list (list, optional): Only invalidate these ids. Defaults to all.
+
+    Returns:
+        int: The number of cache entries removed.
+    """
+    marketplaces = [marketplace] if marketplace else list(const.MARKETS)
+    removed = 0
+    for market in marketplaces:
+        cache = get_cache(market)
+        if categories_list is None:
+            removed += cache.clear()
+        else:
+            removed += sum(cache.delete(str(c)) for c in categories_list)
+    add_log(f"Invalidated {removed} cached categories")
+    return removed
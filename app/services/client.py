@@ -0,0 +1,91 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.services import const, ratelimit
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _is_emag_host(host: str) -> bool:
+    return host.startswith("marketplace-api.emag.")
+
+
+def _emag_budget(url: str):
+    """
+    Returns the (marketplace, resource) rate budget an eMAG URL is charged to,
+    e.g. ("ro", "save") for .../emag.ro/api-3/product_offer/save.
+    """
+    parts = urlsplit(url)
+    marketplace = parts.netloc.rsplit(".", 1)[-1]
+    action = parts.path.rstrip("/").rsplit("/", 1)[-1]
+    return marketplace, "save" if action == "save" else "read"
+
+
+def _build_session(host: str) -> requests.Session:
+    """
+    Creates a keep-alive session for a single host with a sized connection pool.
+    eMAG hosts get the default authorization headers from const.EMAG_HEADERS.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=const.HTTP_POOL_SIZE,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if _is_emag_host(host):
+        session.headers.update(const.EMAG_HEADERS)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Returns the shared session for the host of the given URL, creating it on first use.
+
+    Args:
+        url (str): Any URL on the target host.
+
+    Returns:
+        requests.Session: The pooled session for that host.
+    """
+    host = urlsplit(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _build_session(host)
+                _sessions[host] = session
+    return session
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Sends a request through the pooled session of the URL's host.
+    Applies the configured connect/read timeouts unless a timeout is given, and
+    waits for the marketplace's rate budget before every eMAG request.
+    """
+    kwargs.setdefault("timeout", (const.HTTP_CONNECT_TIMEOUT, const.HTTP_READ_TIMEOUT))
+    if _is_emag_host(urlsplit(url).netloc):
+        ratelimit.acquire(*_emag_budget(url))
+    return get_session(url).request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def close_sessions():
+    """Closes all pooled sessions (e.g. at the end of a standalone script)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
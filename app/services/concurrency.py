@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+
+# Latencies and the concurrency history are measured on the same monotonic clock
+clock = time.monotonic
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimiter:
+    """
+    Limits in-flight async requests with an AIMD (additive increase, multiplicative
+    decrease) window.
+
+    Every healthy response grows the window by about one slot per window's worth of
+    requests. A response is healthy when the smoothed latency stays within
+    `latency_tolerance` times the fastest one seen. A throttling error (e.g. a 429),
+    or other errors once their smoothed rate exceeds `error_threshold`, multiplies
+    the window by `decrease`, at most once per cohort of requests that started
+    before the previous cut. Every change is recorded in `history`.
+
+    Example usage:
+
+    >> limiter = AdaptiveLimiter(initial=20, maximum=200, throttle_exceptions=(RateLimitError,))
+    >> async with limiter.slot():
+    >>     resp = await client.chat.completions.create(...)
+    """
+
+    def __init__(
+        self,
+        initial: int = 10,
+        minimum: int = 1,
+        maximum: int = 100,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        error_threshold: float = 0.25,
+        throttle_exceptions: tuple = (),
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.throttle_exceptions = throttle_exceptions
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+        self._started = clock()
+        self._last_cut = self._started
+        self._base_latency = None
+        self._avg_latency = None
+        self._error_rate = 0.0
+        self._condition = asyncio.Condition()
+        self.history = [(0.0, int(self.limit))]
+
+    def _record(self):
+        current = int(self.limit)
+        if current != self.history[-1][1]:
+            self.history.append((round(clock() - self._started, 1), current))
+            logger.info(f"LLM concurrency set to {current}")
+
+    def _cut(self, started: float):
+        # Requests that were already in flight when the window was cut report
+        # the same overload; only the first of them shrinks the window
+        if started < self._last_cut:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self._last_cut = clock()
+        self._record()
+
+    def _on_success(self, latency: float):
+        self.successes += 1
+        self._error_rate *= 0.8
+        if self._base_latency is None or latency < self._base_latency:
+            self._base_latency = latency
+        self._avg_latency = (
+            latency
+            if self._avg_latency is None
+            else 0.8 * self._avg_latency + 0.2 * latency
+        )
+        if self._avg_latency <= self._base_latency * self.latency_tolerance:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._record()
+
+    def _on_throttle(self, started: float):
+        self.throttled += 1
+        self._cut(started)
+
+    def _on_error(self, started: float):
+        # Timeouts and server errors also signal overload, but a single one may
+        # be a bad request, so only a sustained error rate shrinks the window
+        self.errors += 1
+        self._error_rate = 0.8 * self._error_rate + 0.2
+        if self._error_rate > self.error_threshold:
+            self._cut(started)
+
+    async def acquire(self) -> float:
+        """Waits for a free slot in the window and returns the request start time."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return clock()
+
+    async def release(self, started: float, exc_type=None):
+        """Frees the slot taken at `started` and adapts the window to the outcome."""
+        if exc_type is None:
+            self._on_success(clock() - started)
+        elif self.throttle_exceptions and issubclass(
+            exc_type, self.throttle_exceptions
+        ):
+            self._on_throttle(started)
+        else:
+            self._on_error(started)
+        async with self._condition:
+            self.in_flight -= 1
+            # Wake only as many waiters as there are free slots (the window may
+            # have grown in _on_success); waking all of them is O(n^2) when
+            # thousands of requests are queued
+            self._condition.notify(max(0, int(self.limit) - self.in_flight))
+
+    def slot(self) -> "_Slot":
+        """Returns an async context manager holding one slot for a single request."""
+        return _Slot(self)
+
+    def summary(self) -> dict:
+        """Returns the request counters and the concurrency history as [(seconds, limit), ...]."""
+        limits = [limit for _, limit in self.history]
+        return {
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "final_concurrency": int(self.limit),
+            "min_concurrency": min(limits),
+            "max_concurrency": max(limits),
+            "history": list(self.history),
+        }
+
+
+class _Slot:
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self.started = None
+
+    async def __aenter__(self):
+        self.started = await self.limiter.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.limiter.release(self.started, exc_type)
+        return False
@@ -12,6 +12,71 @@ EMAG_HEADERS = {
 }
 EMAG_URL = "https://marketplace-api.emag.{}/api-3/"
 FITNESS1_API_URL = "https://fitness1.bg/b2b/api/products_v3"
+
+# HTTP client settings (connection pooling and timeouts, in seconds)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT") or "10")
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT") or "120")
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE") or "10")
+
+# eMAG request budgets per marketplace (requests per second and burst size)
+EMAG_RATE_LIMITS = {
+    "read": {
+        "rate": float(os.getenv("EMAG_READ_RATE") or "3"),
+        "burst": int(os.getenv("EMAG_READ_BURST") or "3"),
+    },
+    "save": {
+        "rate": float(os.getenv("EMAG_SAVE_RATE") or "3"),
+        "burst": int(os.getenv("EMAG_SAVE_BURST") or "3"),
+    },
+}
+# Marketplace registry used by the update engine.
+# Prices come from Fitness1 in BGN and are converted to the market currency.
+MARKETS = {
+    "bg": {
+        "url_ext": "bg",
+        "currency": "BGN",
+        "vat_id": 6,
+        "rounding": 2,
+        "fields": ("sale_price", "status", "vat_id"),
+    },
+    "ro": {
+        "url_ext": "ro",
+        "currency": "RON",
+        "vat_id": 2002,
+        "rounding": 2,
+        "fields": ("sale_price", "status", "vat_id"),
+    },
+    "hu": {
+        "url_ext": "hu",
+        "currency": "HUF",
+        "vat_id": 2002,
+        "rounding": 2,
+        "fields": ("sale_price", "status", "vat_id"),
+    },
+}
+# Exchange rates (BGN -> market currency) are persisted here and refreshed after this age
+RATES_CACHE_PATH = os.getenv("RATES_CACHE_PATH") or "exchange_rates.json"
+RATES_MAX_AGE_HOURS = float(os.getenv("RATES_MAX_AGE_HOURS") or "24")
+
+# Persistent on-disk caches (eMAG category definitions, LLM translations)
+CACHE_DIR = os.getenv("CACHE_DIR") or "cache"
+CATEGORY_CACHE_TTL_HOURS = float(os.getenv("CATEGORY_CACHE_TTL_HOURS") or "168")
+# Bump whenever the LLM prompts in initialize.process_product change,
+# so cached translations and characteristic picks are not reused
+TRANSLATION_PROMPT_VERSION = "2"
+
+# Multi-product LLM translation batches (estimated input tokens / products per request)
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET") or "3000")
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS") or "20")
+# Adaptive LLM concurrency: starting window and upper bound of in-flight requests
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY") or "20")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY") or "200")
+# Offer fields pushed by each update mode
+UPDATE_MODES = {
+    "price": ("sale_price", "vat_id"),
+    "status": ("status",),
+    "both": ("sale_price", "status", "vat_id"),
+}
 FITNESS_CATEGORIES = [
     "Спортни протектори за тяло",
     "Шейкъри и бутилки",
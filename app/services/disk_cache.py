@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+class DiskCache:
+    """
+    A small persistent key/value store with one JSON file per entry.
+
+    Entries are written atomically (temp file + rename), so several threads, jobs or
+    gunicorn workers can share the same directory. An entry older than `ttl` seconds
+    is treated as missing.
+
+    Example usage:
+
+    >> cache = DiskCache(os.path.join(const.CACHE_DIR, "categories"), ttl=3600)
+    >> cache.set("bg:2735", category)
+    >> category = cache.get("bg:2735")
+    """
+
+    def __init__(self, directory: str, ttl: float = None):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key: str, default=None):
+        """Returns the value stored under `key`, or `default` if missing or expired."""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return default
+        if self.ttl is not None and time.time() - entry["stored_at"] >= self.ttl:
+            return default
+        return entry["value"]
+
+    def set(self, key: str, value):
+        """Stores a JSON-serializable `value` under `key`."""
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {"key": key, "stored_at": time.time(), "value": value}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, key: str) -> bool:
+        """Removes `key` from the cache. Returns True if an entry was removed."""
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def clear(self) -> int:
+        """Removes every entry in the cache directory. Returns the number removed."""
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        for name in names:
+            if name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
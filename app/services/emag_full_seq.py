@@ -1,73 +1,208 @@
 import json
-import time
+import threading
 import psutil
 import os
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
-
+from app import progress
 from app.logger import add_log
-from app.services import const, util
+from app.services import category_cache, client, const, mappings, pricing, util
+from app.services.id_allocator import ProductIdAllocator
 
 
-def fetch_all_emag_products(api_url: str, headers: dict, pause: int = 0) -> list:
+def fetch_all_emag_products(
+    api_url: str,
+    headers: dict,
+    concurrent: bool = False,
+    max_workers: int = 4,
+) -> tuple:
     """
     Fetches all products from a given API URL with pagination.
 
+    In concurrent mode the number of pages is determined first (via the resource's
+    count action, or by probing), and the pages are then fetched by a bounded worker
+    pool. Every request is paced by the marketplace's read budget (see ratelimit).
+    The products are always returned in page order.
+
     Args:
         api_url (str): The API URL to query.
         headers (dict): The headers to include in the request.
-        pause (int, optional): The number of seconds to pause between requests. Defaults to 0.
+        concurrent (bool, optional): Fetch the pages in parallel. Defaults to False.
+        max_workers (int, optional): Number of parallel page fetches. Defaults to 4.
 
     Returns:
-        list: A list of products fetched from the API.
+        tuple: (result, products) where result is False if any page failed.
     """
-    page = 1  # starting page
     items_per_page = 100  # number of items per page
-    all_products = []
+    if not concurrent:
+        return _fetch_emag_pages_sequential(
+            api_url, headers, start_page=1, items_per_page=items_per_page
+        )
+
+    page_count = fetch_emag_page_count(api_url, headers, items_per_page)
+    if page_count is None:
+        page_count = _probe_emag_page_count(api_url, headers, items_per_page)
+    if page_count is None:
+        add_log("Could not determine the page count. Falling back to sequential fetch.")
+        return _fetch_emag_pages_sequential(
+            api_url, headers, start_page=1, items_per_page=items_per_page
+        )
+    add_log(f"Fetching {page_count} pages with {max_workers} workers.")
+
+    def fetch_page(page):
+        return _fetch_emag_page(api_url, headers, page, items_per_page)
+
     result = True
+    pages = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_page, page): page for page in range(1, page_count + 1)
+        }
+        for future in as_completed(futures):
+            page = futures[future]
+            page_ok, products = future.result()
+            if not page_ok:
+                result = False
+            pages[page] = products
+            add_log(f"Fetched {len(products)} products from page {page}")
+
+    all_products = [product for page in sorted(pages) for product in pages[page]]
+
+    # Pick up anything added to the catalog after the count was taken
+    tail_result, tail_products = _fetch_emag_pages_sequential(
+        api_url,
+        headers,
+        start_page=page_count + 1,
+        items_per_page=items_per_page,
+    )
+    all_products.extend(tail_products)
+    if not tail_result:
+        result = False
 
-    while True:
-        # Set up parameters for pagination
-        payload = {"currentPage": page, "itemsPerPage": items_per_page}
-        response = requests.post(api_url, json=payload, headers=headers)
+    return result, all_products
 
-        # Check for a successful request
-        if response.status_code != 200:
-            add_log(
-                f"Request failed at page {page} with status: {response.status_code}"
-            )
-            result = False
-            break
-        data = response.json()
-        if data["isError"]:
 
-            add_log(
-                f"Request failed at page >>{page}<< with messages: {data['messages']} and errors: {data['errors']}"
-            )
-            result = False
+def _fetch_emag_page(api_url: str, headers: dict, page: int, items_per_page: int):
+    """
+    Fetches a single page of a paginated eMAG resource.
+
+    Returns:
+        tuple: (ok, products). ok is False on an HTTP or API error.
+    """
+    payload = {"currentPage": page, "itemsPerPage": items_per_page}
+    response = client.post(api_url, json=payload, headers=headers)
+
+    if response.status_code != 200:
+        add_log(f"Request failed at page {page} with status: {response.status_code}")
+        return False, []
+    data = response.json()
+    if data["isError"]:
+        add_log(
+            f"Request failed at page >>{page}<< with messages: {data['messages']} and errors: {data['errors']}"
+        )
+        return False, data.get("results", [])
+    return True, data.get("results", [])
+
+
+def _fetch_emag_pages_sequential(
+    api_url: str, headers: dict, start_page: int, items_per_page: int
+):
+    """Reads pages one after another starting at `start_page` until an empty page."""
+    page = start_page
+    all_products = []
+    result = True
 
-        # Parse the JSON response
-        products = data.get("results", [])
-        add_log(f"Request successful at page {page}")
+    while True:
+        page_ok, products = _fetch_emag_page(api_url, headers, page, items_per_page)
+        if not page_ok:
+            result = False
 
-        # If the products list is empty, we've reached the end
+        # An empty page (or a failed request) ends the pagination
         if not products:
-            add_log(f"No products found on page {page}. Ending pagination.")
+            if page_ok:
+                add_log(f"No products found on page {page}. Ending pagination.")
             break
 
         # Append the products from the current page to our total list
         all_products.extend(products)
-        if not all_products:
-            result = False
         add_log(f"Fetched {len(products)} products from page {page}")
 
         # Move to the next page
         page += 1
-        time.sleep(pause)
 
     return result, all_products
 
 
+def fetch_emag_page_count(api_url: str, headers: dict, items_per_page: int = 100):
+    """
+    Asks the resource's count action how many pages a read will return.
+
+    Args:
+        api_url (str): The read URL of the resource (e.g. .../product_offer/read).
+        headers (dict): The headers to include in the request.
+        items_per_page (int, optional): Page size used for the read. Defaults to 100.
+
+    Returns:
+        int: The number of pages, or None if the count is not available.
+    """
+    count_url = api_url.rstrip("/").rsplit("/", 1)[0] + "/count"
+    response = client.post(
+        count_url, json={"itemsPerPage": items_per_page}, headers=headers
+    )
+    if response.status_code != 200:
+        add_log(f"Count request failed with status: {response.status_code}")
+        return None
+    data = response.json()
+    if data.get("isError", False):
+        add_log(f"Count request failed with messages: {data.get('messages')}")
+        return None
+
+    results = data.get("results") or {}
+    try:
+        items = int(results.get("noOfItems"))
+    except (TypeError, ValueError):
+        return None
+    return -(-items // items_per_page)
+
+
+def _probe_emag_page_count(api_url: str, headers: dict, items_per_page: int):
+    """
+    Finds the last non-empty page with an exponential search followed by a
+    binary search. Returns None if any probe request fails.
+    """
+
+    def has_products(page):
+        page_ok, products = _fetch_emag_page(api_url, headers, page, items_per_page)
+        if not page_ok:
+            return None
+        return bool(products)
+
+    found = has_products(1)
+    if not found:
+        return None if found is None else 0
+
+    low, high = 1, 2
+    while True:
+        found = has_products(high)
+        if found is None:
+            return None
+        if not found:
+            break
+        low, high = high, high * 2
+
+    while high - low > 1:
+        middle = (low + high) // 2
+        found = has_products(middle)
+        if found is None:
+            return None
+        if found:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
 def fetch_all_fitness1_products(api_url: str, api_key: str) -> list:
     """
     Fetches all products from a given API URL with a given API key.
@@ -79,7 +214,7 @@ def fetch_all_fitness1_products(api_url: str, api_key: str) -> list:
     Returns:
         list: A list of products fetched from the API.
     """
-    response = requests.get(api_url, params={"key": api_key, "description": "1"})
+    response = client.get(api_url, params={"key": api_key, "description": "1"})
 
     # Check for a successful request
     if response.status_code != 200:
@@ -94,112 +229,57 @@ def fetch_all_fitness1_products(api_url: str, api_key: str) -> list:
 
 
 def fetch_all_categories_from_categories_list_emag(
-    api_url: str, headers: dict, categories_list: list, pause: int = 0
+    api_url: str, headers: dict, categories_list: list
 ) -> list:
     """
-    Fetches all categories from a list of category IDs by making API requests.
+    Fetches all categories from a list of category IDs.
+    Categories are served from the on-disk category cache; only the missing ones
+    are requested from the API.
 
     Args:
         api_url (str): The API URL to query.
         headers (dict): The headers to include in the request.
         categories_list (list): A list of category IDs to fetch.
-        pause (int, optional): The number of seconds to pause between requests. Defaults to 0.
 
     Returns:
         list: A list of categories fetched from the API.
     """
+    categories = category_cache.get_categories(api_url, headers, categories_list)
 
     all_categories = []
-
-    # Set up parameters for pagination
-    for category in categories_list:
-        payload = {"id": category}
-        response = requests.post(api_url, json=payload, headers=headers)
-
-        # Check for a successful request
-        if response.status_code != 200:
-            add_log(
-                f"Request failed for category {category} with status: {response.status_code}"
-            )
-            break
-        data = response.json()
-        if data["isError"]:
-
-            add_log(
-                f"Request failed for category >>{category}<< with messages: {data['messages']} and errors: {data['errors']}"
-            )
-
-        # Parse the JSON response
-        category_data = data.get("results", [])
-        add_log(f"Request successful for category {category}")
-
-        # If the products list is empty, we've reached the end
-        if not category_data:
-            add_log("No category data found.")
-            break
-
-        # Append the products from the current page to our total list
+    for category_data in categories.values():
         all_categories.extend(category_data)
 
-        # Move to the next page
-        time.sleep(pause)
-
     add_log(f"Fetched {len(all_categories)} categories")
     return all_categories
 
 
 def fetch_categories_characteristics_dict(
-    api_url: str, headers: dict, categories_list: list, pause: int = 0
+    api_url: str, headers: dict, categories_list: list
 ) -> dict:
     """
     Fetches characteristics for each category in categories_list by ID,
     returning a dict where keys are category IDs and values are the
     'characteristics' payload from the API.
+    Categories are served from the on-disk category cache; only the missing ones
+    are requested from the API.
 
     Args:
         api_url (str): The API endpoint URL.
         headers (dict): HTTP headers to include with each request.
         categories_list (list): A list of category IDs to fetch.
-        pause (int, optional): Seconds to sleep between requests. Defaults to 0.
 
     Returns:
         dict: { category_id: [characteristic_dict, ...], … }
     """
-    categories_by_id = {}
-
-    for category_id in categories_list:
-        payload = {"id": category_id}
-        response = requests.post(api_url, json=payload, headers=headers)
-
-        # HTTP‐level error?
-        if response.status_code != 200:
-            add_log(
-                f"Request failed for category {category_id}: HTTP {response.status_code}"
-            )
-            continue
-
-        data = response.json()
-        # API‐level error?
-        if data.get("isError", False):
-            add_log(
-                f"API error for category {category_id}: "
-                f"messages={data.get('messages')} errors={data.get('errors')}"
-            )
-            continue
-
-        results = data.get("results", [])
-        if not results:
-            add_log(f"No results for category {category_id}")
-            continue
+    categories = category_cache.get_categories(api_url, headers, categories_list)
 
-        # Assuming each result is a category object; map its id → characteristics
+    categories_by_id = {}
+    for results in categories.values():
         for cat in results:
-            cat_id = cat.get("id")
-            chars = cat.get("characteristics", [])
-            categories_by_id[cat_id] = {"characteristics": chars}
-            add_log(f"Fetched {len(chars)} characteristics for category {cat_id}")
-
-        time.sleep(pause)
+            categories_by_id[cat.get("id")] = {
+                "characteristics": cat.get("characteristics", [])
+            }
 
     add_log(f"Fetched characteristics for {len(categories_by_id)} categories")
     return categories_by_id
@@ -207,23 +287,21 @@ def fetch_categories_characteristics_dict(
 
 def create_emag_product_from_fields(
     fitness1_product: util.Fitness1Product,
-    fitness1_related_emag_products_based_on_ean: list[dict],
-    all_emag_product_ids: list[int],
+    emag_ean_index: dict,
+    id_allocator: ProductIdAllocator,
     f1_to_emag_categories: dict,
 ):
     emag_product = util.create_emag_product_from_fitness1_product(fitness1_product)
-    if emag_product.ean in [
-        product["ean"][0] for product in fitness1_related_emag_products_based_on_ean
-    ]:
+    if emag_product.ean in emag_ean_index:
         # get the id of the found product and set it to the emag product
         emag_product.id = util.get_emag_product_id_by_ean(
-            emag_product.ean, fitness1_related_emag_products_based_on_ean
+            emag_product.ean, emag_ean_index
         )
         emag_product.part_number = util.get_emag_part_number_by_ean(
-            emag_product.ean, fitness1_related_emag_products_based_on_ean
+            emag_product.ean, emag_ean_index
         )
     else:
-        emag_product.id = util.get_valid_emag_product_id(all_emag_product_ids)
+        emag_product.id = id_allocator.next_id()
     emag_product.category_id = util.get_emag_category_data_by_fitness1_category(
         f1_to_emag_categories, fitness1_product.category
     ).get("id")
@@ -235,7 +313,6 @@ def post_emag_product(
     emag_product_data: list[dict],
     api_url: str,
     headers: dict,
-    pause=0,
     batch_size=50,
 ):
     batched_emag_products_data = util.split_list(
@@ -243,17 +320,14 @@ def post_emag_product(
     )
     failed_products = []
     for i, batch in enumerate(batched_emag_products_data):
-
-        time.sleep(pause)
-        response = requests.post(api_url, json=batch, headers=headers)
+        response = client.post(api_url, json=batch, headers=headers)
         if not response.ok:
             add_log(f"Request failed with status: {response.status_code}")
-        add_log(response.json())
         data = util.EmagResponse(response.json())
 
         if data.is_error:
             add_log(
-                f"Request failed >>{batch}<< with messages: {data.messages} and errors: {data.errors}"
+                f"Request failed for batch {i} ({len(batch)} products) with messages: {data.messages} and errors: {data.errors}"
             )
             failed_products.append(
                 {
@@ -265,17 +339,18 @@ def post_emag_product(
             )
             # return data
 
-    add_log(f"Request successful for product {emag_product_data}")
+    add_log(
+        f"Posted {len(emag_product_data)} products in {len(batched_emag_products_data)} batches, {len(failed_products)} batches failed"
+    )
     return failed_products
 
 
-def update_emag_products(batch_size=50, pause=1):
+def update_emag_products(batch_size=50):
     all_emag_products = fetch_all_emag_products(
         api_url=util.build_url(
             base_url=const.EMAG_URL, resource="product_offer", action="read"
         ),
         headers=const.EMAG_HEADERS,
-        pause=1,
     )
 
     add_log(f"Fetched {len(all_emag_products)} EMAG products")
@@ -297,8 +372,7 @@ def update_emag_products(batch_size=50, pause=1):
     failed_updates = []
 
     for i, batch in enumerate(batched_updated_emag_product_data):
-        time.sleep(pause)
-        response = requests.post(
+        response = client.post(
             util.build_url(
                 base_url=const.EMAG_URL, resource="product_offer", action="save"
             ),
@@ -307,12 +381,11 @@ def update_emag_products(batch_size=50, pause=1):
         )
         if not response.ok:
             add_log(f"Request failed with status: {response.status_code}")
-        add_log(response.json())
         data = util.EmagResponse(response.json())
 
         if data.is_error:
             add_log(
-                f"Request failed >>{batch}<< with messages: {data.messages} and errors: {data.errors}"
+                f"Request failed for batch {i} ({len(batch)} products) with messages: {data.messages} and errors: {data.errors}"
             )
             failed_updates.append(
                 {
@@ -331,7 +404,7 @@ def update_emag_products(batch_size=50, pause=1):
         add_log("Failed updates saved to failed_updates.json")
 
 
-def run_create_process(pause=1, batch_size=50, emag_url_ext="bg"):
+def run_create_process(batch_size=50, emag_url_ext="bg"):
     """
     Executes the complete create process.
 
@@ -347,7 +420,6 @@ def run_create_process(pause=1, batch_size=50, emag_url_ext="bg"):
       9. Posts the created EMAG products in batches.
 
     Parameters:
-      pause (int): Number of seconds to pause between API requests.
       batch_size (int): Number of products to include in each batch when posting.
 
     Returns:
@@ -366,7 +438,7 @@ def run_create_process(pause=1, batch_size=50, emag_url_ext="bg"):
             action="read",
         ),
         headers=const.EMAG_HEADERS,
-        pause=pause,
+        concurrent=True,
     )
     if not emag_products_result:
         add_log("Failed to fetch EMAG products.")
@@ -405,7 +477,6 @@ def run_create_process(pause=1, batch_size=50, emag_url_ext="bg"):
         ),
         headers=const.EMAG_HEADERS,
         categories_list=current_emag_categories,
-        pause=pause,
     )
     add_log(f"Fetched {len(all_emag_categories)} EMAG categories.")
 
@@ -420,15 +491,12 @@ def run_create_process(pause=1, batch_size=50, emag_url_ext="bg"):
         category["name"] for category in all_fitness_emag_categories
     ]
 
-    # Step 6: Build a mapping between Fitness1 and EMAG categories
-    categories_mapping = util.build_mapping(
+    # Step 6: Resolve the mapping between Fitness1 and EMAG categories
+    # (stored mappings are reused, only new Fitness1 categories are scored)
+    mapped_categories_strings = mappings.resolve_category_mappings(
         fitness1_categories=all_fitness1_categories,
         emag_categories=emag_categories_names,
         threshold=80,
-        keywords_mapping=const.KEYWORDS_MAPPING,
-    )
-    mapped_categories_strings = util.map_fitness1_category_to_emag_category_string(
-        categories_mapping
     )
 
     # Step 7: Filter Fitness1 products to include only those with a mapped EMAG category
@@ -445,16 +513,22 @@ def run_create_process(pause=1, batch_size=50, emag_url_ext="bg"):
         mapped_categories_strings, all_fitness_emag_categories
     )
 
-    # Get all existing EMAG product IDs (for generating a valid new ID if needed)
-    all_emag_product_ids = [product["id"] for product in emag_products_fetched]
+    # Allocate ids for new products from the persistent per-marketplace sequence
+    id_allocator = ProductIdAllocator(
+        emag_url_ext,
+        existing_ids=[product["id"] for product in emag_products_fetched],
+    )
+
+    # Index the related EMAG products by EAN once for constant-time lookups
+    emag_ean_index = util.build_emag_ean_index(fitness1_related_emag_products)
 
     # Step 9: Create new EMAG products by merging data from Fitness1 with EMAG category info
     emag_products_created = []
     for fitness1_product in valid_fitness1_products:
         emag_product = create_emag_product_from_fields(
             fitness1_product,
-            fitness1_related_emag_products,
-            all_emag_product_ids,
+            emag_ean_index,
+            id_allocator,
             f1_to_emag_categories,
         )
         emag_products_created.append(emag_product)
@@ -472,7 +546,6 @@ def run_create_process(pause=1, batch_size=50, emag_url_ext="bg"):
             action="save",
         ),
         headers=const.EMAG_HEADERS,
-        pause=pause * 2,
         batch_size=batch_size,
     )
 
@@ -492,346 +565,224 @@ def run_create_process(pause=1, batch_size=50, emag_url_ext="bg"):
     }
 
 
-def _run_update_process(build_entry_func, pause=1, batch_size=50, emag_url_ext="bg"):
-    """Generic update process used by price and status updates."""
-    process = psutil.Process(os.getpid())
-    mem_before = process.memory_info().rss
-    cpu_before = process.cpu_times().user
-
-    add_log("Starting product update process...")
+def _iter_emag_offer_pages(emag_url_ext="bg", items_per_page=100):
+    """
+    Streams the product_offer/read pages of a marketplace.
 
-    fitness1_products = fetch_all_fitness1_products(
-        api_url=const.FITNESS1_API_URL, api_key=const.FITNESS1_API_KEY
+    Yields:
+        tuple: (page, emag_products) for every non-empty page, stopping at the first
+        empty page or at the first failed request.
+    """
+    read_url = util.build_url(
+        base_url=const.EMAG_URL,
+        url_ext=emag_url_ext,
+        resource="product_offer",
+        action="read",
     )
-    if not fitness1_products:
-        add_log("Failed to fetch Fitness1 products.")
-        return {"fitness1_products_fetched": 0}
-
-    add_log(f"Fetched {len(fitness1_products)} Fitness1 products.")
-
-    fitness1_index = {product["barcode"]: product for product in fitness1_products}
-
     page = 1
-    items_per_page = 100
-    total_emag_products = 0
-    total_updates = 0
-    failed_batches = []
 
     while True:
         payload = {"currentPage": page, "itemsPerPage": items_per_page}
-        response = requests.post(
-            url=util.build_url(
-                base_url=const.EMAG_URL,
-                url_ext=emag_url_ext,
-                resource="product_offer",
-                action="read",
-            ),
-            json=payload,
-            headers=const.EMAG_HEADERS,
-        )
+        response = client.post(url=read_url, json=payload, headers=const.EMAG_HEADERS)
 
         if response.status_code != 200:
             add_log(
                 f"Failed to fetch EMAG products at page {page}. Status: {response.status_code}"
             )
-            break
+            return
 
         data = response.json()
 
         if data.get("isError", False):
             add_log(f"Error fetching page {page}: {data.get('messages', [])}")
-            break
+            return
 
         emag_products = data.get("results", [])
 
         if not emag_products:
             add_log(f"No more products found on page {page}. Ending pagination.")
-            break
-
-        total_emag_products += len(emag_products)
-        add_log(f"Fetched {len(emag_products)} EMAG products on page {page}.")
-
-        update_batch = []
-        for emag_product in emag_products:
-            ean_list = emag_product.get("ean", [])
-            if not ean_list:
-                continue
-
-            barcode = ean_list[0]
-            fitness1_product = fitness1_index.get(barcode)
-
-            if fitness1_product:
-                entry = build_entry_func(emag_product, fitness1_product)
-                if entry:
-                    update_batch.append(entry)
-
-        batched_updates = util.split_list(update_batch, batch_size)
-
-        for i, batch in enumerate(batched_updates):
-            if not batch:
-                continue
-            add_log(f"Posting batch {i+1} of {len(batched_updates)} on page {page}...")
-            time.sleep(pause)
-
-            save_response = requests.post(
-                url=util.build_url(
-                    base_url=const.EMAG_URL,
-                    url_ext=emag_url_ext,
-                    resource="product_offer",
-                    action="save",
-                ),
-                json=batch,
-                headers=const.EMAG_HEADERS,
-            )
+            return
 
-            if not save_response.ok:
-                add_log(
-                    f"Save failed for batch {i+1} on page {page}. Status: {save_response.status_code}"
-                )
-                failed_batches.append(
-                    {
-                        "page": page,
-                        "batch": i + 1,
-                        "status_code": save_response.status_code,
-                        "response": save_response.text,
-                    }
-                )
-                continue
-
-            save_data = util.EmagResponse(save_response.json())
-            if save_data.is_error:
-                add_log(
-                    f"Errors in batch {i+1} on page {page}: {save_data.messages} {save_data.errors}"
-                )
-                failed_batches.append(
-                    {
-                        "page": page,
-                        "batch": i + 1,
-                        "errors": save_data.errors,
-                        "messages": save_data.messages,
-                    }
-                )
-            else:
-                total_updates += len(batch)
+        add_log(
+            f"Fetched {len(emag_products)} EMAG products on page {page} ({emag_url_ext})."
+        )
+        yield page, emag_products
 
         page += 1
 
-    add_log(
-        f"Update process completed: {total_updates} successful updates, {len(failed_batches)} failed batches."
-    )
-    mem_after = process.memory_info().rss
-    cpu_after = process.cpu_times().user
-    add_log(f"Memory used: {(mem_after - mem_before) / 1024 / 1024:.2f} MB")
-    add_log(f"CPU time used: {cpu_after - cpu_before:.2f} seconds")
-
-    return {
-        "fitness1_products_fetched": len(fitness1_products),
-        "emag_products_fetched": total_emag_products,
-        "updated_entries": total_updates,
-        "failed_updates": failed_batches,
-    }
-
-
-def run_update_process(pause=1, batch_size=50, emag_url_ext="bg"):
-    """Update both price and status for products."""
-
-    def build_entry(emag_product, fitness1_product):
-        return {
-            "id": emag_product["id"],
-            "sale_price": fitness1_product["regular_price"],
-            "status": fitness1_product["available"],
-            "vat_id": 6,
-        }
-
-    return _run_update_process(build_entry, pause, batch_size, emag_url_ext)
 
+def _save_offer_batch(save_url: str, batch: list, page: int, batch_no: int):
+    """
+    Posts one product_offer/save batch.
 
-def run_update_status_process(pause=1, batch_size=50, emag_url_ext="bg"):
-    """Update only the status field for products."""
+    Returns:
+        dict: Details of the failure, or None if the batch was saved.
+    """
+    save_response = client.post(url=save_url, json=batch, headers=const.EMAG_HEADERS)
 
-    def build_entry(emag_product, fitness1_product):
+    if not save_response.ok:
+        add_log(
+            f"Save failed for batch {batch_no} on page {page}. Status: {save_response.status_code}"
+        )
         return {
-            "id": emag_product["id"],
-            "status": fitness1_product["available"],
+            "page": page,
+            "batch": batch_no,
+            "status_code": save_response.status_code,
+            "response": save_response.text,
         }
 
-    return _run_update_process(build_entry, pause, batch_size, emag_url_ext)
-
-
-def run_update_price_process(pause=1, batch_size=50, emag_url_ext="bg"):
-    """Update only the price for products."""
-
-    def build_entry(emag_product, fitness1_product):
+    save_data = util.EmagResponse(save_response.json())
+    if save_data.is_error:
+        add_log(
+            f"Errors in batch {batch_no} on page {page}: {save_data.messages} {save_data.errors}"
+        )
         return {
-            "id": emag_product["id"],
-            "sale_price": fitness1_product["regular_price"],
-            "vat_id": 6,
+            "page": page,
+            "batch": batch_no,
+            "errors": save_data.errors,
+            "messages": save_data.messages,
         }
+    return None
 
-    return _run_update_process(build_entry, pause, batch_size, emag_url_ext)
-
-
-def run_update_combined_process(pause=1, batch_size=50, emag_url_ext="bg"):
-    """Update both price and status for products."""
-
-    def build_entry(emag_product, fitness1_product):
-        return {
-            "id": emag_product["id"],
-            "sale_price": fitness1_product["regular_price"],
-            "status": fitness1_product["available"],
-            "vat_id": 6,
-        }
 
-    return _run_update_process(build_entry, pause, batch_size, emag_url_ext)
+def _run_update_process(
+    build_entry_func,
+    batch_size=50,
+    emag_url_ext="bg",
+    writers=1,
+    queue_size=4,
+    delta=True,
+    fitness1_index=None,
+):
+    """
+    Generic update process used by price and status updates.
 
+    Reading and saving run as a pipeline: the calling thread streams offer pages and
+    queues save batches, while `writers` threads drain the queue at the same time.
+    The queue holds at most `queue_size` batches, so a slow writer stalls the reader
+    instead of letting pending batches pile up in memory.
 
-def run_update_romania_process(pause=1, batch_size=50, emag_url_ext="ro"):
-    """
-    Optimized version of the update process with streaming.
+    With `delta` enabled only entries that differ from the offer just read are sent.
+    A prebuilt `fitness1_index` (barcode -> product) skips the Fitness1 download.
     """
     process = psutil.Process(os.getpid())
     mem_before = process.memory_info().rss
     cpu_before = process.cpu_times().user
-    from currency_converter import CurrencyConverter
 
-    c = CurrencyConverter()
+    add_log(f"Starting product update process ({emag_url_ext})...")
 
-    add_log("Starting product update process...")
-
-    # Step 1: Fetch all Fitness1 products once
-    fitness1_products = fetch_all_fitness1_products(
-        api_url=const.FITNESS1_API_URL, api_key=const.FITNESS1_API_KEY
-    )
-    if not fitness1_products:
-        add_log("Failed to fetch Fitness1 products.")
-        return {"fitness1_products_fetched": 0}
+    if fitness1_index is None:
+        fitness1_products = fetch_all_fitness1_products(
+            api_url=const.FITNESS1_API_URL, api_key=const.FITNESS1_API_KEY
+        )
+        if not fitness1_products:
+            add_log("Failed to fetch Fitness1 products.")
+            return {"fitness1_products_fetched": 0}
 
-    add_log(f"Fetched {len(fitness1_products)} Fitness1 products.")
+        add_log(f"Fetched {len(fitness1_products)} Fitness1 products.")
 
-    # Create a lookup table for Fitness1 products by barcode
-    fitness1_index = {product["barcode"]: product for product in fitness1_products}
+        fitness1_index = {product["barcode"]: product for product in fitness1_products}
 
-    # Step 2: Stream EMAG products page by page
-    page = 1
-    items_per_page = 100  # or whatever you want
+    progress.start(emag_url_ext)
+    save_url = util.build_url(
+        base_url=const.EMAG_URL,
+        url_ext=emag_url_ext,
+        resource="product_offer",
+        action="save",
+    )
     total_emag_products = 0
     total_updates = 0
+    total_unchanged = 0
     failed_batches = []
+    stats_lock = threading.Lock()
+    save_queue = queue.Queue(maxsize=queue_size)
+
+    def save_worker():
+        nonlocal total_updates
+        while True:
+            item = save_queue.get()
+            if item is None:
+                break
+            page, batch_no, batch = item
+            add_log(f"Posting batch {batch_no} ({len(batch)} entries, page {page})...")
+            try:
+                failure = _save_offer_batch(save_url, batch, page, batch_no)
+            except Exception as e:
+                add_log(f"Save failed for batch {batch_no} on page {page}: {e}")
+                failure = {"page": page, "batch": batch_no, "errors": [str(e)]}
+            with stats_lock:
+                if failure:
+                    failed_batches.append(failure)
+                    progress.increment(emag_url_ext, failed_batches=1)
+                else:
+                    total_updates += len(batch)
+                    progress.increment(
+                        emag_url_ext, batches_sent=1, entries_sent=len(batch)
+                    )
+
+    worker_threads = [
+        threading.Thread(target=save_worker, daemon=True) for _ in range(writers)
+    ]
+    for thread in worker_threads:
+        thread.start()
+
+    def enqueue(item) -> bool:
+        # Never block forever on a full queue once every writer has died
+        while True:
+            try:
+                save_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                if not any(thread.is_alive() for thread in worker_threads):
+                    return False
+
+    accumulator = util.BatchAccumulator(batch_size)
+    batch_no = 0
+    page = 0
+
+    try:
+        for page, emag_products in _iter_emag_offer_pages(emag_url_ext):
+            total_emag_products += len(emag_products)
+            progress.update(emag_url_ext, page=page)
+
+            update_batch = []
+            for emag_product in emag_products:
+                ean_list = emag_product.get("ean", [])
+                if not ean_list:
+                    continue
+
+                barcode = ean_list[0]
+                fitness1_product = fitness1_index.get(barcode)
+
+                if fitness1_product:
+                    entry = build_entry_func(emag_product, fitness1_product)
+                    if not entry:
+                        continue
+                    if delta and not util.offer_needs_update(entry, emag_product):
+                        total_unchanged += 1
+                        continue
+                    update_batch.append(entry)
 
-    while True:
-        # Fetch one page of EMAG products
-        payload = {"currentPage": page, "itemsPerPage": items_per_page}
-        response = requests.post(
-            url=util.build_url(
-                base_url=const.EMAG_URL,
-                url_ext=emag_url_ext,
-                resource="product_offer",
-                action="read",
-            ),
-            json=payload,
-            headers=const.EMAG_HEADERS,
-        )
-
-        if response.status_code != 200:
-            add_log(
-                f"Failed to fetch EMAG products at page {page}. Status: {response.status_code}"
-            )
-            break
-
-        data = response.json()
-
-        if data.get("isError", False):
-            add_log(f"Error fetching page {page}: {data.get('messages', [])}")
-            break
-
-        emag_products = data.get("results", [])
-
-        if not emag_products:
-            add_log(f"No more products found on page {page}. Ending pagination.")
-            break
-
-        total_emag_products += len(emag_products)
-        add_log(f"Fetched {len(emag_products)} EMAG products on page {page}.")
-
-        # Map EMAG products to Fitness1 products
-        update_batch = []
-        for emag_product in emag_products:
-            ean_list = emag_product.get("ean", [])
-            if not ean_list:
-                continue  # skip products without EAN
-
-            barcode = ean_list[0]
-            fitness1_product = fitness1_index.get(barcode)
-
-            if fitness1_product:
-                # Build update entry
-                update_batch.append(
-                    {
-                        "id": emag_product["id"],
-                        "sale_price": round(
-                            c.convert(fitness1_product["regular_price"], "BGN", "RON"),
-                            2,
-                        ),
-                        "status": fitness1_product["available"],
-                        "vat_id": 2002,
-                    }
-                )
-
-        # Split into smaller batches
-        batched_updates = util.split_list(update_batch, batch_size)
-
-        # Send each batch
-        for i, batch in enumerate(batched_updates):
-            if not batch:
-                continue
-            add_log(f"Posting batch {i+1} of {len(batched_updates)} on page {page}...")
-            time.sleep(pause)
-
-            save_response = requests.post(
-                url=util.build_url(
-                    base_url=const.EMAG_URL,
-                    url_ext=emag_url_ext,
-                    resource="product_offer",
-                    action="save",
-                ),
-                json=batch,
-                headers=const.EMAG_HEADERS,
-            )
-
-            if not save_response.ok:
-                add_log(
-                    f"Save failed for batch {i+1} on page {page}. Status: {save_response.status_code}"
-                )
-                failed_batches.append(
-                    {
-                        "page": page,
-                        "batch": i + 1,
-                        "status_code": save_response.status_code,
-                        "response": save_response.text,
-                    }
-                )
-                continue
-
-            save_data = util.EmagResponse(save_response.json())
-            if save_data.is_error:
-                add_log(
-                    f"Errors in batch {i+1} on page {page}: {save_data.messages} {save_data.errors}"
-                )
-                failed_batches.append(
-                    {
-                        "page": page,
-                        "batch": i + 1,
-                        "errors": save_data.errors,
-                        "messages": save_data.messages,
-                    }
-                )
-            else:
-                total_updates += len(batch)
-
-        page += 1  # go to next page
+            progress.update(emag_url_ext, unchanged_entries=total_unchanged)
+            for batch in accumulator.add(update_batch):
+                batch_no += 1
+                if not enqueue((page, batch_no, batch)):
+                    raise RuntimeError("All save workers stopped.")
+
+        for batch in accumulator.flush():
+            batch_no += 1
+            if not enqueue((page, batch_no, batch)):
+                raise RuntimeError("All save workers stopped.")
+    finally:
+        for _ in worker_threads:
+            enqueue(None)
+        for thread in worker_threads:
+            thread.join()
+        progress.finish(emag_url_ext)
 
     add_log(
-        f"Update process completed: {total_updates} successful updates, {len(failed_batches)} failed batches."
+        f"Update process completed: {total_updates} successful updates, "
+        f"{total_unchanged} unchanged, {len(failed_batches)} failed batches."
     )
     mem_after = process.memory_info().rss
     cpu_after = process.cpu_times().user
@@ -839,229 +790,193 @@ def run_update_romania_process(pause=1, batch_size=50, emag_url_ext="ro"):
     add_log(f"CPU time used: {cpu_after - cpu_before:.2f} seconds")
 
     return {
-        "fitness1_products_fetched": len(fitness1_products),
+        "fitness1_products_fetched": len(fitness1_index),
         "emag_products_fetched": total_emag_products,
         "updated_entries": total_updates,
+        "unchanged_entries": total_unchanged,
         "failed_updates": failed_batches,
     }
 
 
-def run_update_hungarian_process(pause=1, batch_size=50, emag_url_ext="hu"):
+def build_market_entry_func(market: str, price_table, mode: str = "both"):
+    """
+    Builds the update entry function for a marketplace and update mode.
+
+    Args:
+        market (str): A key of const.MARKETS (e.g. "bg", "ro", "hu").
+        price_table (pricing.PriceTable): Precomputed prices of the Fitness1 catalog.
+        mode (str): A key of const.UPDATE_MODES ("price", "status" or "both").
+
+    Returns:
+        callable: build_entry(emag_product, fitness1_product) -> dict, or None
+        if the product has nothing to update (e.g. no usable price in price mode)
     """
-    Optimized version of the update process with streaming.
+    market_config = const.MARKETS[market]
+    fields = [
+        field for field in const.UPDATE_MODES[mode] if field in market_config["fields"]
+    ]
+
+    def build_entry(emag_product, fitness1_product):
+        entry = {"id": emag_product["id"]}
+        price = None
+        if "sale_price" in fields:
+            price = price_table.get(fitness1_product["barcode"], market)
+        if price is not None:
+            entry["sale_price"] = price
+            if "vat_id" in fields:
+                entry["vat_id"] = market_config["vat_id"]
+        # Without a usable price the price fields are left out, the status is
+        # still pushed
+        if "status" in fields:
+            entry["status"] = fitness1_product["available"]
+        if len(entry) == 1:
+            # Nothing to push for this product
+            return None
+        return entry
+
+    return build_entry
+
+
+def run_market_update_process(
+    market="bg",
+    mode="both",
+    batch_size=50,
+    delta=True,
+    fitness1_index=None,
+    price_table=None,
+):
     """
-    process = psutil.Process(os.getpid())
-    mem_before = process.memory_info().rss
-    cpu_before = process.cpu_times().user
-    from currency_converter import CurrencyConverter
+    Streams the offers of one marketplace and pushes the fields of `mode`.
+    Every market and mode goes through the same pipelined update engine.
+    """
+    if fitness1_index is None:
+        fitness1_products = fetch_all_fitness1_products(
+            api_url=const.FITNESS1_API_URL, api_key=const.FITNESS1_API_KEY
+        )
+        if not fitness1_products:
+            add_log("Failed to fetch Fitness1 products.")
+            return {"fitness1_products_fetched": 0}
 
-    c = CurrencyConverter()
+        add_log(f"Fetched {len(fitness1_products)} Fitness1 products.")
 
-    add_log("Starting product update process...")
+        fitness1_index = {product["barcode"]: product for product in fitness1_products}
 
-    # Step 1: Fetch all Fitness1 products once
-    fitness1_products = fetch_all_fitness1_products(
-        api_url=const.FITNESS1_API_URL, api_key=const.FITNESS1_API_KEY
+    if price_table is None:
+        price_table = pricing.build_price_table(
+            list(fitness1_index.values()), [market]
+        )
+
+    return _run_update_process(
+        build_market_entry_func(market, price_table, mode),
+        batch_size,
+        const.MARKETS[market]["url_ext"],
+        delta=delta,
+        fitness1_index=fitness1_index,
     )
-    if not fitness1_products:
-        add_log("Failed to fetch Fitness1 products.")
-        return {"fitness1_products_fetched": 0}
 
-    add_log(f"Fetched {len(fitness1_products)} Fitness1 products.")
 
-    # Create a lookup table for Fitness1 products by barcode
-    fitness1_index = {product["barcode"]: product for product in fitness1_products}
+def run_update_process(batch_size=50, emag_url_ext="bg"):
+    """Update both price and status for products."""
+    return run_market_update_process(emag_url_ext, "both", batch_size)
 
-    # Step 2: Stream EMAG products page by page
-    page = 1
-    items_per_page = 100  # or whatever you want
-    total_emag_products = 0
-    total_updates = 0
-    failed_batches = []
 
-    while True:
-        # Fetch one page of EMAG products
-        payload = {"currentPage": page, "itemsPerPage": items_per_page}
-        response = requests.post(
-            url=util.build_url(
-                base_url=const.EMAG_URL,
-                url_ext=emag_url_ext,
-                resource="product_offer",
-                action="read",
-            ),
-            json=payload,
-            headers=const.EMAG_HEADERS,
-        )
+def run_update_status_process(batch_size=50, emag_url_ext="bg"):
+    """Update only the status field for products."""
+    return run_market_update_process(emag_url_ext, "status", batch_size)
 
-        if response.status_code != 200:
-            add_log(
-                f"Failed to fetch EMAG products at page {page}. Status: {response.status_code}"
-            )
-            break
 
-        data = response.json()
+def run_update_price_process(batch_size=50, emag_url_ext="bg"):
+    """Update only the price for products."""
+    return run_market_update_process(emag_url_ext, "price", batch_size)
 
-        if data.get("isError", False):
-            add_log(f"Error fetching page {page}: {data.get('messages', [])}")
-            break
 
-        emag_products = data.get("results", [])
+def run_update_combined_process(batch_size=50, emag_url_ext="bg"):
+    """Update both price and status for products."""
+    return run_market_update_process(emag_url_ext, "both", batch_size)
 
-        if not emag_products:
-            add_log(f"No more products found on page {page}. Ending pagination.")
-            break
 
-        total_emag_products += len(emag_products)
-        add_log(f"Fetched {len(emag_products)} EMAG products on page {page}.")
-
-        # Map EMAG products to Fitness1 products
-        update_batch = []
-        for emag_product in emag_products:
-            ean_list = emag_product.get("ean", [])
-            if not ean_list:
-                continue  # skip products without EAN
-
-            barcode = ean_list[0]
-            fitness1_product = fitness1_index.get(barcode)
-
-            if fitness1_product:
-                # Build update entry
-                update_batch.append(
-                    {
-                        "id": emag_product["id"],
-                        "sale_price": round(
-                            c.convert(fitness1_product["regular_price"], "BGN", "HUF"),
-                            2,
-                        ),
-                        "status": fitness1_product["available"],
-                        "vat_id": 2002,
-                    }
-                )
-
-        # Split into smaller batches
-        batched_updates = util.split_list(update_batch, batch_size)
-
-        # Send each batch
-        for i, batch in enumerate(batched_updates):
-            if not batch:
-                continue
-            add_log(f"Posting batch {i+1} of {len(batched_updates)} on page {page}...")
-            time.sleep(pause)
-
-            save_response = requests.post(
-                url=util.build_url(
-                    base_url=const.EMAG_URL,
-                    url_ext=emag_url_ext,
-                    resource="product_offer",
-                    action="save",
-                ),
-                json=batch,
-                headers=const.EMAG_HEADERS,
-            )
+def run_update_all_markets_process(
+    batch_size=50, markets=("bg", "ro", "hu"), mode="both"
+):
+    """
+    Updates price and status on several marketplaces in one orchestrated run.
 
-            if not save_response.ok:
-                add_log(
-                    f"Save failed for batch {i+1} on page {page}. Status: {save_response.status_code}"
-                )
-                failed_batches.append(
-                    {
-                        "page": page,
-                        "batch": i + 1,
-                        "status_code": save_response.status_code,
-                        "response": save_response.text,
-                    }
-                )
-                continue
-
-            save_data = util.EmagResponse(save_response.json())
-            if save_data.is_error:
-                add_log(
-                    f"Errors in batch {i+1} on page {page}: {save_data.messages} {save_data.errors}"
-                )
-                failed_batches.append(
-                    {
-                        "page": page,
-                        "batch": i + 1,
-                        "errors": save_data.errors,
-                        "messages": save_data.messages,
-                    }
-                )
-            else:
-                total_updates += len(batch)
-
-        page += 1  # go to next page
+    Fitness1 is fetched and indexed once, and the offer streams of all markets run
+    at the same time, each paced by its own marketplace rate budget.
+    """
+    add_log(f"Starting multi-market update process for {', '.join(markets)}...")
 
-    add_log(
-        f"Update process completed: {total_updates} successful updates, {len(failed_batches)} failed batches."
+    fitness1_products = fetch_all_fitness1_products(
+        api_url=const.FITNESS1_API_URL, api_key=const.FITNESS1_API_KEY
     )
-    mem_after = process.memory_info().rss
-    cpu_after = process.cpu_times().user
-    add_log(f"Memory used: {(mem_after - mem_before) / 1024 / 1024:.2f} MB")
-    add_log(f"CPU time used: {cpu_after - cpu_before:.2f} seconds")
+    if not fitness1_products:
+        add_log("Failed to fetch Fitness1 products.")
+        return {"fitness1_products_fetched": 0}
+
+    add_log(f"Fetched {len(fitness1_products)} Fitness1 products.")
+
+    fitness1_index = {product["barcode"]: product for product in fitness1_products}
+    price_table = pricing.build_price_table(fitness1_products, list(markets))
+
+    with ThreadPoolExecutor(max_workers=len(markets)) as executor:
+        futures = {
+            market: executor.submit(
+                run_market_update_process,
+                market,
+                mode,
+                batch_size,
+                fitness1_index=fitness1_index,
+                price_table=price_table,
+            )
+            for market in markets
+        }
+        summaries = {market: future.result() for market, future in futures.items()}
 
     return {
         "fitness1_products_fetched": len(fitness1_products),
-        "emag_products_fetched": total_emag_products,
-        "updated_entries": total_updates,
-        "failed_updates": failed_batches,
+        "emag_products_fetched": sum(
+            summary["emag_products_fetched"] for summary in summaries.values()
+        ),
+        "updated_entries": sum(
+            summary["updated_entries"] for summary in summaries.values()
+        ),
+        "unchanged_entries": sum(
+            summary["unchanged_entries"] for summary in summaries.values()
+        ),
+        "failed_updates": [
+            dict(failure, market=market)
+            for market, summary in summaries.items()
+            for failure in summary["failed_updates"]
+        ],
+        "markets": summaries,
     }
 
 
-def run_update_status_romania_process(pause=1, batch_size=50):
-    """Update only the status field for Romania products."""
+def run_update_romania_process(batch_size=50, emag_url_ext="ro"):
+    """Update both price and status for Romania products."""
+    return run_market_update_process(emag_url_ext, "both", batch_size)
 
-    def build_entry(emag_product, fitness1_product):
-        return {
-            "id": emag_product["id"],
-            "status": fitness1_product["available"],
-        }
 
-    return _run_update_process(build_entry, pause, batch_size, "ro")
+def run_update_hungarian_process(batch_size=50, emag_url_ext="hu"):
+    """Update both price and status for Hungarian products."""
+    return run_market_update_process(emag_url_ext, "both", batch_size)
 
 
-def run_update_price_romania_process(pause=1, batch_size=50):
-    """Update only the price for Romania products."""
-    from currency_converter import CurrencyConverter
-
-    c = CurrencyConverter()
+def run_update_status_romania_process(batch_size=50):
+    """Update only the status field for Romania products."""
+    return run_market_update_process("ro", "status", batch_size)
 
-    def build_entry(emag_product, fitness1_product):
-        return {
-            "id": emag_product["id"],
-            "sale_price": round(
-                c.convert(fitness1_product["regular_price"], "BGN", "RON"), 2
-            ),
-            "vat_id": 2002,
-        }
 
-    return _run_update_process(build_entry, pause, batch_size, "ro")
+def run_update_price_romania_process(batch_size=50):
+    """Update only the price for Romania products."""
+    return run_market_update_process("ro", "price", batch_size)
 
 
-def run_update_status_hungarian_process(pause=1, batch_size=50):
+def run_update_status_hungarian_process(batch_size=50):
     """Update only the status field for Hungarian products."""
+    return run_market_update_process("hu", "status", batch_size)
 
-    def build_entry(emag_product, fitness1_product):
-        return {
-            "id": emag_product["id"],
-            "status": fitness1_product["available"],
-        }
 
-    return _run_update_process(build_entry, pause, batch_size, "hu")
-
-
-def run_update_price_hungarian_process(pause=1, batch_size=50):
+def run_update_price_hungarian_process(batch_size=50):
     """Update only the price for Hungarian products."""
-    from currency_converter import CurrencyConverter
-
-    c = CurrencyConverter()
-
-    def build_entry(emag_product, fitness1_product):
-        return {
-            "id": emag_product["id"],
-            "sale_price": round(
-                c.convert(fitness1_product["regular_price"], "BGN", "HUF"), 2
-            ),
-            "vat_id": 2002,
-        }
-
-    return _run_update_process(build_entry, pause, batch_size, "hu")
+    return run_market_update_process("hu", "price", batch_size)
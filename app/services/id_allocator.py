@@ -0,0 +1,85 @@
+import threading
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.logger import add_log
+from app.models import ProductIdSequence
+from app.services import util
+
+
+def _seed_next_id(existing_ids: list) -> int:
+    """
+    Picks the first id for a marketplace that has no sequence row yet, using the
+    same outlier-tolerant heuristic as before on the most recent offer ids.
+    """
+    if not existing_ids:
+        return 1
+    _, new_id, _ = util.get_id_and_outliers(existing_ids[-10:])
+    return new_id
+
+
+class ProductIdAllocator:
+    """
+    Hands out new eMAG product ids for one marketplace.
+
+    Ids come from a per-marketplace row in the product_id_sequences table and are
+    reserved in blocks with a single atomic UPDATE, so allocation is O(1), survives
+    restarts and never hands the same id to two jobs or gunicorn workers. Must be
+    used inside an application context.
+
+    Example usage:
+
+    >> allocator = ProductIdAllocator("ro", existing_ids=all_emag_product_ids)
+    >> emag_product.id = allocator.next_id()
+    """
+
+    def __init__(self, marketplace: str, existing_ids: list = None, block_size=50):
+        self.marketplace = marketplace
+        self.block_size = block_size
+        self._existing_ids = list(existing_ids or [])
+        self._taken = set(self._existing_ids)
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _ensure_sequence(self):
+        if db.session.get(ProductIdSequence, self.marketplace) is not None:
+            return
+        seed = _seed_next_id(self._existing_ids)
+        db.session.add(ProductIdSequence(marketplace=self.marketplace, next_id=seed))
+        try:
+            db.session.commit()
+            add_log(f"Seeded product id sequence for {self.marketplace} at {seed}")
+        except IntegrityError:
+            # Another process created the row first
+            db.session.rollback()
+
+    def _reserve_block(self):
+        self._ensure_sequence()
+        db.session.execute(
+            update(ProductIdSequence)
+            .where(ProductIdSequence.marketplace == self.marketplace)
+            .values(next_id=ProductIdSequence.next_id + self.block_size)
+        )
+        end = db.session.execute(
+            select(ProductIdSequence.next_id).where(
+                ProductIdSequence.marketplace == self.marketplace
+            )
+        ).scalar_one()
+        db.session.commit()
+        self._next, self._end = end - self.block_size, end
+
+    def next_id(self) -> int:
+        """Returns a new product id that no other allocation has handed out."""
+        with self._lock:
+            while True:
+                if self._next >= self._end:
+                    self._reserve_block()
+                new_id = self._next
+                self._next += 1
+                # Skip ids that already exist on the marketplace
+                if new_id not in self._taken:
+                    self._taken.add(new_id)
+                    return new_id
@@ -0,0 +1,64 @@
+from app import db
+from app.logger import add_log
+from app.models import Mapping
+from app.services import const, util
+
+
+def resolve_category_mappings(
+    fitness1_categories: list,
+    emag_categories: list,
+    threshold: int = const.THRESHLOD,
+    keywords_mapping: dict = const.KEYWORDS_MAPPING,
+) -> dict:
+    """
+    Resolves the Fitness1 -> eMAG category mapping incrementally.
+
+    Mappings already stored in the Mapping table (including manual edits made through
+    PATCH /api/mappings) are reused as they are. Fuzzy scoring only runs for Fitness1
+    categories that have no stored mapping yet, and the new matches are persisted.
+    Must be used inside an application context.
+
+    Args:
+        fitness1_categories (list): The Fitness1 category strings to resolve.
+        emag_categories (list): The eMAG category names a category may map to.
+        threshold (int, optional): The fuzzy matching threshold.
+        keywords_mapping (dict, optional): Keyword boosts per eMAG category.
+
+    Returns:
+        dict: {fitness1_category: emag_category} for every resolvable category.
+    """
+    known = {
+        mapping.fitness1_category: mapping.emag_category
+        for mapping in Mapping.query.order_by(Mapping.id).all()
+    }
+    allowed = set(emag_categories)
+
+    resolved = {
+        f1_cat: known[f1_cat]
+        for f1_cat in fitness1_categories
+        if f1_cat in known and known[f1_cat] in allowed
+    }
+    unseen = [f1_cat for f1_cat in fitness1_categories if f1_cat not in known]
+    if not unseen:
+        add_log(f"Reused {len(resolved)} stored category mappings.")
+        return resolved
+
+    categories_mapping = util.build_mapping(
+        fitness1_categories=unseen,
+        emag_categories=emag_categories,
+        threshold=threshold,
+        keywords_mapping=keywords_mapping,
+    )
+    new_mappings = util.map_fitness1_category_to_emag_category_string(
+        categories_mapping
+    )
+    for f1_cat, emag_cat in new_mappings.items():
+        db.session.add(Mapping(fitness1_category=f1_cat, emag_category=emag_cat))
+    db.session.commit()
+
+    add_log(
+        f"Reused {len(resolved)} stored category mappings, scored {len(unseen)} new "
+        f"categories and stored {len(new_mappings)} new mappings."
+    )
+    resolved.update(new_mappings)
+    return resolved
@@ -0,0 +1,61 @@
+import numpy as np
+
+from app.services import const, rates
+
+
+def _parse_price(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class PriceTable:
+    """
+    Converted, rounded sale prices of the Fitness1 catalog for every enabled market,
+    indexed by EAN (barcode).
+    """
+
+    def __init__(self, eans: list, prices: dict):
+        self.index = {ean: row for row, ean in enumerate(eans)}
+        self.prices = prices
+
+    def get(self, ean: str, market: str):
+        """Returns the price of `ean` on `market`, or None if it has no usable price."""
+        row = self.index.get(ean)
+        if row is None or market not in self.prices:
+            return None
+        price = self.prices[market][row]
+        return None if np.isnan(price) else float(price)
+
+    def __len__(self):
+        return len(self.index)
+
+
+def build_price_table(fitness1_products: list, markets=None) -> PriceTable:
+    """
+    Computes the sale price of every Fitness1 product on every market in one
+    vectorized pass over the regular_price column.
+
+    Args:
+        fitness1_products (list[dict]): Fitness1 products with "barcode" and "regular_price".
+        markets (list, optional): Keys of const.MARKETS. Defaults to all markets.
+
+    Returns:
+        PriceTable: The EAN-indexed price table.
+    """
+    markets = markets or list(const.MARKETS)
+    eans = [product["barcode"] for product in fitness1_products]
+    base_prices = np.fromiter(
+        (_parse_price(product.get("regular_price")) for product in fitness1_products),
+        dtype=float,
+        count=len(fitness1_products),
+    )
+
+    prices = {}
+    for market in markets:
+        market_config = const.MARKETS[market]
+        rate = rates.get_rate(market_config["currency"])
+        prices[market] = np.round(base_prices * rate, market_config["rounding"])
+
+    return PriceTable(eans, prices)
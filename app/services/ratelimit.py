@@ -0,0 +1,67 @@
+import threading
+import time
+
+from app.services import const
+
+# All buckets read time from the same monotonic clock
+clock = time.monotonic
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, with bursts of up to `burst`.
+
+    Callers reserve tokens in arrival order; a caller that finds the bucket empty
+    sleeps exactly until its reservation is covered instead of a fixed pause.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Takes `tokens` from the bucket, blocking until they are available.
+
+        Returns:
+            float: The number of seconds the caller waited.
+        """
+        with self._lock:
+            now = clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def get_bucket(marketplace: str, resource: str) -> TokenBucket:
+    """
+    Returns the shared bucket for a marketplace and resource kind ("read" or "save"),
+    sized from const.EMAG_RATE_LIMITS.
+    """
+    key = (marketplace, resource)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(key)
+            if bucket is None:
+                budget = const.EMAG_RATE_LIMITS[resource]
+                bucket = TokenBucket(rate=budget["rate"], burst=budget["burst"])
+                _buckets[key] = bucket
+    return bucket
+
+
+def acquire(marketplace: str, resource: str, tokens: int = 1) -> float:
+    """Blocks until the marketplace's budget for `resource` allows another request."""
+    return get_bucket(marketplace, resource).acquire(tokens)
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+
+from app.logger import add_log
+from app.services import const
+
+_rates = {}
+_loaded_at = None
+_lock = threading.Lock()
+
+
+def _target_currencies() -> list:
+    return sorted({market["currency"] for market in const.MARKETS.values()})
+
+
+def _read_persisted_rates():
+    """Returns (rates, fetched_at) from the rates file, or (None, None) if unusable."""
+    try:
+        with open(const.RATES_CACHE_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+        return data["rates"], data["fetched_at"]
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+def _rates_from(c) -> dict:
+    return {
+        currency: 1.0 if currency == "BGN" else c.convert(1, "BGN", currency)
+        for currency in _target_currencies()
+    }
+
+
+def _build_rates() -> dict:
+    """
+    Downloads the current ECB history and extracts the BGN rate of every market
+    currency. Falls back to the history bundled with currency_converter (which
+    only changes with the package) if the download or a rate lookup fails.
+    """
+    from currency_converter import ECB_URL, CurrencyConverter
+
+    try:
+        return _rates_from(CurrencyConverter(ECB_URL, fallback_on_missing_rate=True))
+    except Exception as e:
+        add_log(f"Could not download ECB exchange rates, using bundled ones: {e}")
+        return _rates_from(CurrencyConverter(fallback_on_missing_rate=True))
+
+
+def _load_rates(force_refresh=False):
+    global _rates, _loaded_at
+
+    max_age = const.RATES_MAX_AGE_HOURS * 3600
+    rates, fetched_at = (None, None) if force_refresh else _read_persisted_rates()
+    if rates is not None and time.time() - fetched_at < max_age:
+        missing = [c for c in _target_currencies() if c not in rates]
+        if not missing:
+            _rates, _loaded_at = rates, fetched_at
+            return
+
+    rates = _build_rates()
+    fetched_at = time.time()
+    try:
+        with open(const.RATES_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": fetched_at, "rates": rates}, f, indent=4)
+    except OSError as e:
+        add_log(f"Could not persist exchange rates: {e}")
+    add_log(f"Refreshed exchange rates: {rates}")
+    _rates, _loaded_at = rates, fetched_at
+
+
+def get_rates(force_refresh=False) -> dict:
+    """
+    Returns the BGN -> currency rate table, loading it at most once per process
+    (and again only when the persisted table is older than RATES_MAX_AGE_HOURS).
+    """
+    max_age = const.RATES_MAX_AGE_HOURS * 3600
+    if (
+        force_refresh
+        or _loaded_at is None
+        or time.time() - _loaded_at >= max_age
+    ):
+        with _lock:
+            if (
+                force_refresh
+                or _loaded_at is None
+                or time.time() - _loaded_at >= max_age
+            ):
+                _load_rates(force_refresh)
+    return _rates
+
+
+def get_rate(currency: str) -> float:
+    """Returns how many units of `currency` one BGN buys."""
+    if currency == "BGN":
+        return 1.0
+    return get_rates()[currency]
+
+
+def convert(price: float, currency: str, rounding: int = 2) -> float:
+    """Converts a BGN price to `currency`, rounded to `rounding` decimals."""
+    return round(float(price) * get_rate(currency), rounding)
+
+
+def convert_many(prices: list, currency: str, rounding: int = 2) -> list:
+    """Converts a whole column of BGN prices to `currency` with a single rate lookup."""
+    rate = get_rate(currency)
+    return [round(float(price) * rate, rounding) for price in prices]
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import os
+
+from app.services import const
+from app.services.disk_cache import DiskCache
+
+_translations = DiskCache(os.path.join(const.CACHE_DIR, "translations"))
+_characteristics = DiskCache(os.path.join(const.CACHE_DIR, "characteristics"))
+
+
+def _digest(*parts) -> str:
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def product_key(name: str, description: str, lang: str) -> str:
+    """
+    Returns the cache key of a source (Bulgarian) product for one target language.
+    The key changes whenever the name, description or TRANSLATION_PROMPT_VERSION does.
+    """
+    return _digest(name, description, lang, const.TRANSLATION_PROMPT_VERSION)
+
+
+def _characteristics_key(key: str, category_id, category: dict) -> str:
+    # The category's characteristic list is part of the key, so a changed
+    # category definition invalidates the picks made against the old one
+    return _digest(key, category_id, (category or {}).get("characteristics"))
+
+
+def get_translation(key: str):
+    """Returns the cached {"product_name", "description"} for `key`, or None."""
+    return _translations.get(key)
+
+
+def set_translation(key: str, name_desc: dict):
+    _translations.set(key, name_desc)
+
+
+def get_characteristics(key: str, category_id, category: dict):
+    """Returns the cached characteristic picks of a product in a category, or None."""
+    return _characteristics.get(_characteristics_key(key, category_id, category))
+
+
+def set_characteristics(key: str, category_id, category: dict, characteristics: list):
+    _characteristics.set(
+        _characteristics_key(key, category_id, category), characteristics
+    )
@@ -2,7 +2,8 @@ import html
 import re
 import statistics
 from typing import Dict, List
-from fuzzywuzzy import fuzz
+import numpy as np
+from rapidfuzz import fuzz, process
 
 
 class Fitness1Product:
@@ -152,6 +153,44 @@ def split_list(lst: list, batch_size=15):
     return [lst[i : i + batch_size] for i in range(0, len(lst), batch_size)]
 
 
+class BatchAccumulator:
+    """
+    Collects update entries across pages and releases them in full batches.
+
+    Example usage:
+
+    >> accumulator = BatchAccumulator(batch_size=50)
+    >> for page_entries in pages:
+    >>     for batch in accumulator.add(page_entries):
+    >>         post(batch)
+    >> for batch in accumulator.flush():
+    >>     post(batch)
+    """
+
+    def __init__(self, batch_size=50):
+        self.batch_size = batch_size
+        self._pending = []
+
+    def add(self, entries: list) -> list:
+        """Adds entries and returns the batches that reached `batch_size`."""
+        self._pending.extend(entries)
+        ready = []
+        while len(self._pending) >= self.batch_size:
+            ready.append(self._pending[: self.batch_size])
+            self._pending = self._pending[self.batch_size :]
+        return ready
+
+    def flush(self) -> list:
+        """Returns the remaining entries as a final batch (if any)."""
+        if not self._pending:
+            return []
+        batch, self._pending = self._pending, []
+        return [batch]
+
+    def __len__(self):
+        return len(self._pending)
+
+
 def create_product_name(product: dict) -> str:
     """
     Constructs a name string from product dictionary.
@@ -221,7 +260,7 @@ def get_fitness1_related_emag_products_based_on_ean(
     Returns:
         list: A list of eMAG products whose EAN matches a barcode of a Fitness1 product in the input list.
     """
-    fitness1_product_eans = [product["barcode"] for product in fitness1_products]
+    fitness1_product_eans = {product["barcode"] for product in fitness1_products}
     fitness1_related_emag_products = []
     for product in emag_products:
         if not product.get("ean"):
@@ -290,42 +329,95 @@ def update_emag_product_data(emag_p_to_f1_p_map: list[tuple]):
     return updated_emag_product_data
 
 
-def get_emag_product_id_by_ean(ean: str, emag_products: list[dict]) -> int:
+def _normalize_offer_value(field: str, value):
+    """Brings an offer field to a comparable form (prices as 2-decimal floats, flags as ints)."""
+    try:
+        if field == "sale_price":
+            return round(float(value), 2)
+        if field in ("status", "vat_id"):
+            return int(value)
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def offer_needs_update(entry: dict, emag_product: dict) -> bool:
     """
-    Retrieves the ID of an eMAG product based on its EAN.
+    Checks whether an update entry would change anything on an eMAG offer.
+
+    Args:
+        entry (dict): The update entry (e.g. {"id", "sale_price", "status", "vat_id"}).
+        emag_product (dict): The offer as returned by product_offer/read.
+
+    Returns:
+        bool: True if at least one field of the entry differs from the offer.
+    """
+    for field, value in entry.items():
+        if field == "id":
+            continue
+        if _normalize_offer_value(field, value) != _normalize_offer_value(
+            field, emag_product.get(field)
+        ):
+            return True
+    return False
+
+
+def build_emag_ean_index(emag_products: list[dict]) -> dict:
+    """
+    Builds a lookup table from EAN to the offer record, so create and lookup
+    helpers don't have to scan the product list for every Fitness1 product.
 
     Args:
-        ean (str): The EAN of the eMAG product.
         emag_products (list[dict]): A list of dictionaries representing eMAG products,
                                     each containing an "ean" key.
 
     Returns:
-        int: The ID of the eMAG product, or None if not found.
+        dict: {ean: {"id": ..., "part_number": ..., "category_id": ...}}. If several
+              offers share an EAN, the first one wins.
     """
+    index = {}
     for product in emag_products:
-        if product["ean"][0] == ean:
-            return product["id"]
+        if not product.get("ean"):
+            continue
+        index.setdefault(
+            product["ean"][0],
+            {
+                "id": product.get("id"),
+                "part_number": product.get("part_number"),
+                "category_id": product.get("category_id"),
+            },
+        )
+    return index
+
 
-    return None
+def get_emag_product_id_by_ean(ean: str, emag_ean_index: dict) -> int:
+    """
+    Retrieves the ID of an eMAG product based on its EAN.
 
+    Args:
+        ean (str): The EAN of the eMAG product.
+        emag_ean_index (dict): The index built by build_emag_ean_index.
 
-def get_emag_part_number_by_ean(ean: str, emag_products: list[dict]) -> str:
+    Returns:
+        int: The ID of the eMAG product, or None if not found.
+    """
+    record = emag_ean_index.get(ean)
+    return record["id"] if record else None
+
+
+def get_emag_part_number_by_ean(ean: str, emag_ean_index: dict) -> str:
     """
     Retrieves the part number of an eMAG product based on its EAN.
 
     Args:
         ean (str): The EAN of the eMAG product.
-        emag_products (list[dict]): A list of dictionaries representing eMAG products,
-                                    each containing an "ean" key.
+        emag_ean_index (dict): The index built by build_emag_ean_index.
 
     Returns:
         str: The part number of the eMAG product, or None if not found.
     """
-    for product in emag_products:
-        if product["ean"][0] == ean:
-            return product["part_number"]
-
-    return None
+    record = emag_ean_index.get(ean)
+    return record["part_number"] if record else None
 
 
 def get_current_emag_products_categories(emag_products: list[dict]) -> list:
@@ -409,6 +501,17 @@ def preprocess(text: str):
     return text
 
 
+def _is_rule_match(emag_category, ec_clean, token_clean, keywords_mapping):
+    """Keyword boost and substring rules shared by is_match and build_mapping."""
+    # Check keyword boost if defined for this small category.
+    if emag_category in keywords_mapping:
+        for kw in keywords_mapping[emag_category]:
+            if kw in token_clean:
+                return True
+
+    return ec_clean in token_clean or token_clean in ec_clean
+
+
 def is_match(emag_category, token, threshold, keywords_mapping):
     """
     Check if a emag category matches a given token (i.e., a substring of a fitness category)
@@ -424,14 +527,7 @@ def is_match(emag_category, token, threshold, keywords_mapping):
     token_clean = preprocess(token)  # e.g., lowercasing & removing punctuation
     ec_clean = preprocess(emag_category)
 
-    # Check keyword boost if defined for this small category.
-    if emag_category in keywords_mapping:
-        for kw in keywords_mapping[emag_category]:
-            if kw in token_clean:
-                return True
-
-    # Otherwise, you can combine fuzzy metrics and substring checks as before.
-    if ec_clean in token_clean or token_clean in ec_clean:
+    if _is_rule_match(emag_category, ec_clean, token_clean, keywords_mapping):
         return True
     score1 = fuzz.token_set_ratio(ec_clean, token_clean)
     score2 = fuzz.partial_ratio(ec_clean, token_clean)
@@ -447,6 +543,11 @@ def build_mapping(
 ):
     """
     Build a dictionary mapping each emag category to a list of matching fitness1 categories.
+
+    Every string is normalized once, and all tokens are scored against all emag
+    categories with two batched rapidfuzz `cdist` calls; the keyword boost and
+    substring rules of is_match are then applied on top of the score matrix.
+
     Parameters:
       - fitness1_categories: set (or list) of fitness1 category strings.
       - emag_categories: list of emag category strings.
@@ -456,24 +557,44 @@ def build_mapping(
       A dict where keys are emag categories and values are lists of matching fitness1 categories.
     """
     mapping = {emag_cat: [] for emag_cat in emag_categories}
-    matched_fitness1_cats = (
-        set()
-    )  # to track which fitness1 categories have been matched
-
-    for fitness1_cat in fitness1_categories:
-        if not fitness1_cat.strip():
-            continue  # Skip empty strings.
-        tokens = get_subcategories(fitness1_cat)
-        matched = False
-        for emag_cat in emag_categories:
-            if any(
-                is_match(emag_cat, token, threshold, keywords_mapping)
-                for token in tokens
+    fitness1_categories = [cat for cat in fitness1_categories if cat.strip()]
+    if not emag_categories or not fitness1_categories:
+        return mapping
+
+    # Normalize every distinct token and emag category exactly once
+    category_tokens = [get_subcategories(cat) for cat in fitness1_categories]
+    token_rows = {}
+    for tokens in category_tokens:
+        for token in tokens:
+            token_rows.setdefault(token, len(token_rows))
+    tokens_clean = [preprocess(token) for token in token_rows]
+    ecs_clean = [preprocess(emag_cat) for emag_cat in emag_categories]
+
+    if tokens_clean:
+        scores = process.cdist(
+            tokens_clean, ecs_clean, scorer=fuzz.token_set_ratio, workers=-1
+        )
+        scores += process.cdist(
+            tokens_clean, ecs_clean, scorer=fuzz.partial_ratio, workers=-1
+        )
+        matches = scores / 2 >= threshold
+    else:
+        matches = np.zeros((0, len(emag_categories)), dtype=bool)
+
+    for row, token_clean in enumerate(tokens_clean):
+        for col, emag_cat in enumerate(emag_categories):
+            if not matches[row, col] and _is_rule_match(
+                emag_cat, ecs_clean[col], token_clean, keywords_mapping
             ):
-                mapping[emag_cat].append(fitness1_cat)
-                matched = True
-        if matched:
-            matched_fitness1_cats.add(fitness1_cat)
+                matches[row, col] = True
+
+    for fitness1_cat, tokens in zip(fitness1_categories, category_tokens):
+        if not tokens:
+            continue
+        rows = [token_rows[token] for token in tokens]
+        matched_cols = np.flatnonzero(matches[rows].any(axis=0))
+        for col in matched_cols:
+            mapping[emag_categories[col]].append(fitness1_cat)
     return mapping
 
 
@@ -588,17 +709,6 @@ def get_id_and_outliers(data, factor=3):
     return max(non_outliers), new_id, outliers
 
 
-def get_valid_emag_product_id(emag_products_ids: list):
-    """
-    Returns the next available id for an emag product
-    """
-    last_10_ids = emag_products_ids[-10:]
-    latest_id, new_id, outliers = get_id_and_outliers(last_10_ids)
-    # insert the new id next to the place of where the last_id is
-    emag_products_ids.insert(emag_products_ids.index(latest_id) + 1, new_id)
-    return new_id
-
-
 def create_emag_product_from_fitness1_product(
     fitness1_product: Fitness1Product,
 ) -> EmagProduct:
@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+# Local SQLite file shared by every worker process on the host
+STATE_DB_PATH = os.getenv("STATE_DB_PATH") or "app_state.db"
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    markets TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    trigger TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    finished_at REAL,
+    counters TEXT,
+    summary TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_started_at ON jobs (started_at);
+CREATE TABLE IF NOT EXISTS job_locks (
+    lock_key TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL
+);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    """
+    Returns this thread's connection to the shared state database, creating the
+    schema on first use. WAL mode lets every worker read while one of them writes.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(STATE_DB_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    Runs the enclosed statements in one write transaction. BEGIN IMMEDIATE takes
+    the write lock up front, so read-modify-write sequences are atomic across
+    processes.
+    """
+    conn = connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def append_log(message) -> int:
+    """Stores a log message and returns its sequence number."""
+    cursor = connect().execute(
+        "INSERT INTO logs (created_at, message) VALUES (?, ?)",
+        (time.time(), json.dumps(message, default=str)),
+    )
+    return cursor.lastrowid
+
+
+def last_log_seq() -> int:
+    """Returns the sequence number of the newest log entry ever stored (kept across clears)."""
+    row = (
+        connect()
+        .execute("SELECT seq FROM sqlite_sequence WHERE name = 'logs'")
+        .fetchone()
+    )
+    return row[0] if row else 0
+
+
+def logs_since(since: int = 0) -> list:
+    """Returns the stored log entries newer than `since` as [(seq, message), ...]."""
+    rows = connect().execute(
+        "SELECT seq, message FROM logs WHERE seq > ? ORDER BY seq", (since,)
+    )
+    return [(seq, json.loads(message)) for seq, message in rows]
+
+
+def trim_logs(capacity: int):
+    """Deletes all but the newest `capacity` log entries."""
+    connect().execute("DELETE FROM logs WHERE seq <= ?", (last_log_seq() - capacity,))
+
+
+def clear_logs():
+    connect().execute("DELETE FROM logs")
+
+
+def get_state(key: str, default=None):
+    row = connect().execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def update_state(key: str, func, default=None):
+    """
+    Atomically replaces the value stored under `key` with `func(current value)`,
+    even when several processes update it at the same time. Returns the new value.
+    """
+    with transaction() as conn:
+        row = conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        value = func(json.loads(row[0]) if row else default)
+        conn.execute(
+            "INSERT INTO state (key, value, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+            "updated_at = excluded.updated_at",
+            (key, json.dumps(value, default=str), time.time()),
+        )
+    return value
+
+
+class SharedDict(MutableMapping):
+    """
+    A dict stored under one key of the shared state database, so that every
+    worker process reads and writes the same values.
+
+    Example usage:
+
+    >> update_job_status = SharedDict("update_job_status", {"running": False})
+    >> update_job_status["running"] = True
+    """
+
+    def __init__(self, key: str, default: dict = None):
+        self.key = key
+        self.default = dict(default or {})
+
+    def _load(self) -> dict:
+        return get_state(self.key, dict(self.default))
+
+    def __getitem__(self, name):
+        return self._load()[name]
+
+    def __setitem__(self, name, value):
+        def apply(current):
+            current[name] = value
+            return current
+
+        update_state(self.key, apply, dict(self.default))
+
+    def __delitem__(self, name):
+        def apply(current):
+            del current[name]
+            return current
+
+        update_state(self.key, apply, dict(self.default))
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
@@ -21,11 +21,21 @@ class Config:
     FLASK_APP = os.environ.get("FLASK_APP", "app:create_app()")
     FLASK_ENV = os.environ.get("FLASK_ENV", "development")
 
-    # APScheduler configuration
+    # APScheduler configuration (Flask-APScheduler reads the SCHEDULER_* keys)
     SCHEDULER_API_ENABLED = True
-    APSCHEDULER_JOBSTORES = {
+    SCHEDULER_JOBSTORES = {
         "default": {"type": "sqlalchemy", "url": SQLALCHEMY_DATABASE_URI}
     }
-    APSCHEDULER_JOB_DEFAULTS = {"coalesce": False, "max_instances": 1}
-    APSCHEDULER_TIMEZONE = "Europe/Sofia"
+    # Only the process holding the scheduler lease runs jobs. A run that falls due
+    # while the lease moves to another process is still started by the new leader.
+    # Only server processes run scheduled jobs (run.py turns this on); CLI
+    # commands and scripts such as initialize.py leave the scheduler stopped
+    SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "False") == "True"
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get("SCHEDULER_LEASE_SECONDS") or "60")
+    SCHEDULER_JOB_DEFAULTS = {
+        "coalesce": False,
+        "max_instances": 1,
+        "misfire_grace_time": 2 * SCHEDULER_LEASE_SECONDS,
+    }
+    SCHEDULER_TIMEZONE = "Europe/Sofia"
     OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
@@ -1,8 +1,6 @@
-import time
 import os
 from typing import Dict, List, Tuple
 from dotenv import load_dotenv
-import requests
 from openai import AsyncOpenAI
 from app import create_app, db
 from app.models import FitnessCategory, Mapping
@@ -18,7 +16,14 @@ from tenacity import (
     RetryError,
 )
 from openai import RateLimitError
-from app.services import const, util
+from app.services import (
+    client as http_client,
+    const,
+    mappings,
+    rates,
+    translations,
+    util,
+)
 from app.services.emag_full_seq import (
     fetch_all_categories_from_categories_list_emag,
     fetch_categories_characteristics_dict,
@@ -26,6 +31,8 @@ from app.services.emag_full_seq import (
     fetch_all_fitness1_products,
     post_emag_product,
 )
+from app.services.concurrency import AdaptiveLimiter
+from app.services.id_allocator import ProductIdAllocator
 
 # Load environment variables from .env file if available
 load_dotenv()
@@ -34,6 +41,8 @@ client = AsyncOpenAI(api_key=openai_api_key, base_url="https://api.deepseek.com"
 
 logger = logging.getLogger(__name__)
 
+LANGUAGES = {"ro": "Romanian", "hu": "Hungarian"}
+
 
 def populate_fitness_categories():
     for cat in const.FITNESS_CATEGORIES:
@@ -54,27 +63,14 @@ def populate_mappings():
     # get a list of the fitness categories names
     emag_categories_names = [cat.name for cat in FitnessCategory.query.all()]
 
-    # Step 6: Build a mapping between Fitness1 and EMAG categories
-    categories_mapping = util.build_mapping(
+    # Step 6: Resolve the mapping between Fitness1 and EMAG categories.
+    # Stored mappings are kept, only categories without a mapping are scored and saved.
+    mapped_categories_strings = mappings.resolve_category_mappings(
         fitness1_categories=all_fitness1_categories,
         emag_categories=emag_categories_names,
         threshold=80,
-        keywords_mapping=const.KEYWORDS_MAPPING,
-    )
-    mapped_categories_strings = util.map_fitness1_category_to_emag_category_string(
-        categories_mapping
     )
-    for f1_cat, emag_cat in mapped_categories_strings.items():
-        # Check if the mapping already exists
-        if (
-            not Mapping.query.filter_by(fitness1_category=f1_cat)
-            .filter_by(emag_category=emag_cat)
-            .first()
-        ):
-            new_mapping = Mapping(fitness1_category=f1_cat, emag_category=emag_cat)
-            db.session.add(new_mapping)
-            print(f"Adding mapping: {f1_cat} -> {emag_cat}")
-    db.session.commit()
+    print(f"Resolved {len(mapped_categories_strings)} mappings.")
     print("Mappings populated successfully.")
 
 
@@ -106,7 +102,7 @@ def update_emag_fitness_products_names():
             base_url=const.EMAG_URL, resource="product_offer", action="read"
         ),
         headers=const.EMAG_HEADERS,
-        pause=0,
+        concurrent=True,
     )
     if not emag_products_result:
         print("Failed to fetch EMAG products.")
@@ -149,8 +145,7 @@ def update_emag_fitness_products_names():
     failed_updates = []
     for i, batch in enumerate(batched_updated_emag_product_data):
         print(f"Posting batch {i+1} of {len(batched_updated_emag_product_data)}...")
-        time.sleep(1)  # Pause between batches
-        response = requests.post(
+        response = http_client.post(
             url=util.build_url(
                 base_url=const.EMAG_URL, resource="product_offer", action="save"
             ),
@@ -204,6 +199,7 @@ def set_emag_categories_ids():
             base_url=const.EMAG_URL, resource="product_offer", action="read"
         ),
         headers=const.EMAG_HEADERS,
+        concurrent=True,
     )
     if not emag_products_result:
         print("Failed to fetch EMAG products.")
@@ -237,10 +233,12 @@ def set_emag_categories_ids():
     print("Categories IDs updated successfully.")
 
 
-async def safe_acreate(**kwargs):
+async def safe_acreate(limiter: AdaptiveLimiter = None, **kwargs):
     """
     Retries only on RateLimitError (or timeout), up to 5 times;
     reraise any other exception immediately.
+    With a limiter, every attempt takes one of its slots, so the backoff between
+    attempts does not hold a slot and rate limits shrink the window.
     """
     async for attempt in AsyncRetrying(
         retry=retry_if_exception_type(RateLimitError),
@@ -249,71 +247,90 @@ async def safe_acreate(**kwargs):
         reraise=True,
     ):
         with attempt:
-            return await client.chat.completions.create(**kwargs)
+            if limiter is None:
+                return await client.chat.completions.create(**kwargs)
+            async with limiter.slot():
+                return await client.chat.completions.create(**kwargs)
+
+
+def _system_message(language: str) -> Dict:
+    return {
+        "role": "system",
+        "content": f"You are a senior e-commerce localization specialist with native-level Bulgarian and {language}. "
+        + "You know how to preserve marketing tone, structure, and SEO-keywords when translating product metadata. "
+        + "When asked, you also act as a category expert and pick the most relevant product attributes from a given list.",
+    }
 
 
 async def process_product(
     prod: util.EmagProduct,
-    sem: asyncio.Semaphore,
     category: Dict,
     lang: str = "ro",
+    limiter: AdaptiveLimiter = None,
 ):
-    if lang == "ro":
-        language = "Romanian"
-    elif lang == "hu":
-        language = "Hungarian"
+    language = LANGUAGES[lang]
     prd_id = prod.id
-    async with sem:
-        prd_str = prod.name
-        # 1) first API call: translation
-        try:
-            messages = [
-                {
-                    "role": "system",
-                    "content": f"You are a senior e-commerce localization specialist with native-level Bulgarian and {language}. "
-                    + "You know how to preserve marketing tone, structure, and SEO-keywords when translating product metadata. "
-                    + "When asked, you also act as a category expert and pick the most relevant product attributes from a given list.",
-                },
-                {
-                    "role": "user",
-                    "content": f"Here is a product in Bulgarian. 1) Translate **both** its name and description into {language}.  "
-                    + "2) Output exactly this JSON schema and nothing else:\n\n"
-                    + "```json\n"
-                    + "{\n"
-                    + '  "product_name": string,     // the translated name\n'
-                    + '  "description": string       // the translated description\n'
-                    + "}\n"
-                    + "```\n\n"
-                    + "Product (BG):\n"
-                    + "- Name: “"
-                    + prd_str
-                    + "”\n"
-                    + "- Description: “"
-                    + prod.description
-                    + "”"
-                    "Don't insert literal tabs, newlines or other control characters inside your JSON — if you need one, use the proper JSON escape (\\t, \\n, etc.).",
-                },
-            ]
+
+    # Re-runs after a partial failure reuse the cached translation and picks
+    source_key = translations.product_key(prod.name, prod.description, lang)
+    name_desc = translations.get_translation(source_key)
+    characteristics = translations.get_characteristics(
+        source_key, prod.category_id, category
+    )
+    if name_desc is not None and characteristics is not None:
+        prod.name = name_desc["product_name"]
+        prod.description = name_desc["description"]
+        prod.characteristics = characteristics
+        return prod
+
+    prd_str = prod.name
+    # 1) first API call: translation
+    try:
+        messages = [
+            _system_message(language),
+            {
+                "role": "user",
+                "content": f"Here is a product in Bulgarian. 1) Translate **both** its name and description into {language}.  "
+                + "2) Output exactly this JSON schema and nothing else:\n\n"
+                + "```json\n"
+                + "{\n"
+                + '  "product_name": string,     // the translated name\n'
+                + '  "description": string       // the translated description\n'
+                + "}\n"
+                + "```\n\n"
+                + "Product (BG):\n"
+                + "- Name: “"
+                + prd_str
+                + "”\n"
+                + "- Description: “"
+                + prod.description
+                + "”"
+                "Don't insert literal tabs, newlines or other control characters inside your JSON — if you need one, use the proper JSON escape (\\t, \\n, etc.).",
+            },
+        ]
+        if name_desc is None:
             resp1 = await safe_acreate(
+                limiter=limiter,
                 model="deepseek-chat",
                 messages=messages,
                 stream=False,
                 response_format={"type": "json_object"},
                 temperature=1.0,
             )
-        except RetryError as re:
-            # all retries failed on RateLimitError
-            logger.error(
-                f"[{prd_id}] translation hit rate limit 5×: {re}", exc_info=True
-            )
-            return None
-        except Exception as e:
-            # BAD: you saw an AttributeError here
-            logger.error(
-                f"[{prd_id}] translation unexpected error: {e!r}", exc_info=True
-            )
-            return None
+    except RetryError as re:
+        # all retries failed on RateLimitError
+        logger.error(
+            f"[{prd_id}] translation hit rate limit 5×: {re}", exc_info=True
+        )
+        return None
+    except Exception as e:
+        # BAD: you saw an AttributeError here
+        logger.error(
+            f"[{prd_id}] translation unexpected error: {e!r}", exc_info=True
+        )
+        return None
 
+    if name_desc is None:
         # **Inspect** the raw resp1 before you do .choices[0].message.content
         logger.debug(f"[{prd_id}] raw resp1: {resp1!r}")
 
@@ -349,13 +366,21 @@ async def process_product(
             # Optionally, re-raise or return None so you can skip this one
             return None
 
+        translations.set_translation(source_key, name_desc)
+    else:
+        text1 = json.dumps(name_desc, ensure_ascii=False)
+
+    if characteristics is None:
         # 2) second API call: characteristics
         try:
-            messages.append({"role": "assistant", "content": text1})
-            messages.append(
+            # Static parts first (system prompt, instructions, category
+            # characteristics) so products of the same category share a
+            # cacheable prompt prefix; the product itself comes last
+            messages = [
+                _system_message(language),
                 {
                     "role": "user",
-                    "content": """Now, based on the translated product name and description, please review this JSON array of category characteristics and pick the most relevant ones for the product.
+                    "content": """Here is a JSON array of category characteristics. For the product given in the next message, pick the most relevant ones based on its translated product name and description.
                     All characteristics must have have a value, or the documentation later will fail.
 
         Return **only** a single JSON object matching this schema:
@@ -371,18 +396,16 @@ async def process_product(
         ]
         }
         ```
-        Make sure to include the "characteristics" key in the output JSON.""",
-                }
-            )
-            messages.append(
-                {
-                    "role": "user",
-                    "content": json.dumps(
-                        category["characteristics"], ensure_ascii=False
-                    ),
-                }
-            )
+        Make sure to include the "characteristics" key in the output JSON.
+
+        Category characteristics:
+        """
+                    + json.dumps(category["characteristics"], ensure_ascii=False),
+                },
+                {"role": "user", "content": text1},
+            ]
             resp2 = await safe_acreate(
+                limiter=limiter,
                 model="deepseek-chat",
                 messages=messages,
                 stream=False,
@@ -425,35 +448,239 @@ async def process_product(
             # Optionally, re-raise or return None so you can skip this one
             return None
 
-        # set the new name, descrition and characteristics
-        prod.name = name_desc["product_name"]
-        prod.description = name_desc["description"]
-        prod.characteristics = char_json["characteristics"]
+        characteristics = char_json["characteristics"]
+        translations.set_characteristics(
+            source_key, prod.category_id, category, characteristics
+        )
 
-        return prod
+    # set the new name, descrition and characteristics
+    prod.name = name_desc["product_name"]
+    prod.description = name_desc["description"]
+    prod.characteristics = characteristics
+
+    return prod
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough to size a batch
+    return len(text) // 4 + 1
+
+
+def pack_translation_batches(
+    emag_products: List[util.EmagProduct],
+    token_budget: int = const.LLM_BATCH_TOKEN_BUDGET,
+    max_items: int = const.LLM_BATCH_MAX_ITEMS,
+) -> List[List[util.EmagProduct]]:
+    """
+    Packs products into translation batches of at most `max_items` products whose
+    name and description fit in `token_budget` tokens. Products that exceed the
+    budget on their own are left out and go through single-product calls.
+    """
+    batches = []
+    batch, batch_tokens = [], 0
+    for prod in emag_products:
+        tokens = _estimate_tokens(prod.name) + _estimate_tokens(prod.description)
+        if tokens > token_budget:
+            continue
+        if batch and (batch_tokens + tokens > token_budget or len(batch) >= max_items):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(prod)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def translate_batch(
+    emag_products: List[util.EmagProduct],
+    lang: str = "ro",
+    limiter: AdaptiveLimiter = None,
+) -> Dict:
+    """
+    Translates several products in one chat-completion request and stores every
+    translation that came back in the translation cache.
+
+    Returns {product_id: {"product_name", "description"}} for the translated products;
+    missing or malformed items are simply absent.
+    """
+    language = LANGUAGES[lang]
+    by_id = {str(prod.id): prod for prod in emag_products}
+    items = [
+        {"id": prod.id, "name": prod.name, "description": prod.description}
+        for prod in emag_products
+    ]
+    messages = [
+        _system_message(language),
+        {
+            "role": "user",
+            "content": f"Here is a JSON array of products in Bulgarian. Translate **both** the name and description of every product into {language}.  "
+            + "Output exactly this JSON schema and nothing else, with one entry per input product and the same ids:\n\n"
+            + "```json\n"
+            + "{\n"
+            + '  "products": [\n'
+            + "    {\n"
+            + '      "id": number,              // the id of the input product\n'
+            + '      "product_name": string,    // the translated name\n'
+            + '      "description": string      // the translated description\n'
+            + "    }\n"
+            + "  ]\n"
+            + "}\n"
+            + "```\n\n"
+            + "Don't insert literal tabs, newlines or other control characters inside your JSON — if you need one, use the proper JSON escape (\\t, \\n, etc.).\n\n"
+            + "Products (BG):\n"
+            + json.dumps(items, ensure_ascii=False),
+        },
+    ]
+
+    try:
+        resp = await safe_acreate(
+            limiter=limiter,
+            model="deepseek-chat",
+            messages=messages,
+            stream=False,
+            response_format={"type": "json_object"},
+            temperature=1.0,
+        )
+        data = json.loads(resp.choices[0].message.content)
+        if not isinstance(data, dict) or not isinstance(
+            data.get("products"), list
+        ):
+            raise ValueError(f"unexpected response shape: {data!r:.200}")
+    except Exception as e:
+        logger.error(
+            f"batch translation of {len(emag_products)} products failed: {e!r}",
+            exc_info=True,
+        )
+        return {}
+
+    translated = {}
+    for item in data["products"]:
+        if not isinstance(item, dict):
+            continue
+        prod = by_id.get(str(item.get("id")))
+        if (
+            prod is None
+            or not isinstance(item.get("product_name"), str)
+            or not isinstance(item.get("description"), str)
+            or not item["product_name"]
+            or not item["description"]
+        ):
+            continue
+        name_desc = {
+            "product_name": item["product_name"],
+            "description": item["description"],
+        }
+        translations.set_translation(
+            translations.product_key(prod.name, prod.description, lang), name_desc
+        )
+        translated[prod.id] = name_desc
+    return translated
+
+
+async def run_batch_translation(
+    emag_products: List[util.EmagProduct],
+    lang: str = "ro",
+    limiter: AdaptiveLimiter = None,
+) -> int:
+    """
+    Pre-translates the products without a cached translation in multi-product
+    requests. process_product then finds the translations in the cache, and only
+    the products a batch failed to return fall back to single-product calls.
+
+    Returns the number of products translated in batches.
+    """
+    pending = [
+        prod
+        for prod in emag_products
+        if translations.get_translation(
+            translations.product_key(prod.name, prod.description, lang)
+        )
+        is None
+    ]
+    batches = pack_translation_batches(pending)
+    results = await asyncio.gather(
+        *(translate_batch(batch, lang, limiter) for batch in batches)
+    )
+    batched = sum(len(result) for result in results)
+    print(
+        f"Batch-translated {batched}/{len(pending)} products in {len(batches)} requests; "
+        f"{len(pending) - batched} fall back to single-product calls."
+    )
+    return batched
+
+
+async def _start_product_tasks(
+    emag_products: List[util.EmagProduct],
+    all_emag_categories: Dict[int, List[Dict]],
+    max_concurrent: int,
+    lang: str,
+    batch_translate: bool,
+) -> Tuple[List[asyncio.Task], AdaptiveLimiter]:
+    """
+    Runs the batch translation (if enabled) and starts one process_product task per
+    product, grouped by category_id. Returns the tasks (in input order) and the limiter.
+    """
+    limiter = AdaptiveLimiter(
+        initial=const.LLM_INITIAL_CONCURRENCY,
+        maximum=max_concurrent,
+        throttle_exceptions=(RateLimitError,),
+    )
+    if batch_translate:
+        await run_batch_translation(emag_products, lang, limiter)
+    # Start products of the same category back to back, so their requests hit
+    # the provider's prompt-prefix cache for that category's characteristics
+    schedule = sorted(
+        range(len(emag_products)),
+        key=lambda i: str(emag_products[i].category_id),
+    )
+    tasks = [None] * len(emag_products)
+    for i in schedule:
+        prod = emag_products[i]
+        category = all_emag_categories.get(prod.category_id, {})
+        tasks[i] = asyncio.create_task(
+            process_product(prod, category, lang, limiter)
+        )
+    return tasks, limiter
+
+
+def _print_concurrency_report(limiter: AdaptiveLimiter):
+    stats = limiter.summary()
+    print(
+        f"LLM concurrency: final {stats['final_concurrency']}, range "
+        f"{stats['min_concurrency']}-{stats['max_concurrency']}, "
+        f"{stats['throttled']} rate-limited responses, {stats['errors']} other errors."
+    )
+    print(
+        "LLM concurrency over time (seconds: limit):",
+        ", ".join(f"{t}: {limit}" for t, limit in stats["history"]),
+    )
 
 
 async def run_process_all(
     emag_products: List[util.EmagProduct],
     all_emag_categories: Dict[int, List[Dict]],
-    max_concurrent: int = 100,
+    max_concurrent: int = const.LLM_MAX_CONCURRENCY,
     lang: str = "ro",
+    batch_translate: bool = True,
 ) -> Tuple[List[Dict], List[Dict]]:
     """
     Given a list of partially built EMAG product objects and the category lookup,
     spin up tasks to translate & pick characteristics, and return the list of
     result-dicts (or None on failure), in the same order.
+    With batch_translate, the names and descriptions are first translated in
+    multi-product requests (see run_batch_translation). Products are scheduled
+    grouped by category_id.
+    In-flight LLM requests are bounded by an AdaptiveLimiter that starts at
+    LLM_INITIAL_CONCURRENCY and adapts between 1 and `max_concurrent`.
 
     Returns a tuple of (translated, failed_products).
     """
     failed_products = []
     translated = []
-    sem = asyncio.Semaphore(max_concurrent)
-    tasks = []
-    for prod in emag_products:
-        cat_id = prod.category_id
-        category = all_emag_categories.get(cat_id, {})
-        tasks.append(asyncio.create_task(process_product(prod, sem, category, lang)))
+    tasks, limiter = await _start_product_tasks(
+        emag_products, all_emag_categories, max_concurrent, lang, batch_translate
+    )
     all_results = await asyncio.gather(*tasks, return_exceptions=False)
     for prod, res in zip(emag_products, all_results):
         if isinstance(res, Exception):
@@ -473,9 +700,112 @@ async def run_process_all(
     print(f"Failed products: {len(failed_products)}.")  # just to see the structure
     if len(failed_products) > 0:
         print("example failed product:", failed_products[0])
+    _print_concurrency_report(limiter)
     return translated, failed_products
 
 
+def _write_jsonl(f, records: List[Dict]):
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+async def run_process_and_post(
+    emag_products: List[util.EmagProduct],
+    all_emag_categories: Dict[int, List[Dict]],
+    lang: str = "ro",
+    post_url: str = None,
+    batch_size: int = 50,
+    output_prefix: str = "updated_emag_products",
+    max_concurrent: int = const.LLM_MAX_CONCURRENCY,
+    batch_translate: bool = True,
+) -> Dict:
+    """
+    Streaming variant of run_process_all for the initial marketplace creation.
+
+    Every product is handled as soon as its translation completes: it is appended
+    to `{output_prefix}.jsonl` and, when `post_url` is given, queued for posting.
+    Each full batch of `batch_size` products is posted right away (in a worker
+    thread, so translation keeps running). A crash therefore loses at most one
+    unposted batch, and the translation cache makes a re-run cheap.
+    Failed translations go to `failed_{output_prefix}.jsonl` and failed post
+    batches to `failed_posted_{output_prefix}.jsonl`.
+
+    Returns:
+        dict: Counters of the run and the list of failed post batches.
+    """
+    tasks, limiter = await _start_product_tasks(
+        emag_products, all_emag_categories, max_concurrent, lang, batch_translate
+    )
+    prod_by_task = dict(zip(tasks, emag_products))
+    to_post = []
+    post_failures = []
+    translated = failed = posted = 0
+
+    with open(f"{output_prefix}.jsonl", "w", encoding="utf-8") as translated_file, open(
+        f"failed_{output_prefix}.jsonl", "w", encoding="utf-8"
+    ) as failed_file, open(
+        f"failed_posted_{output_prefix}.jsonl", "w", encoding="utf-8"
+    ) as failed_posted_file:
+
+        async def post_batch(batch: List[Dict]):
+            failures = await asyncio.to_thread(
+                post_emag_product,
+                emag_product_data=batch,
+                api_url=post_url,
+                headers=const.EMAG_HEADERS,
+                batch_size=batch_size,
+            )
+            _write_jsonl(failed_posted_file, failures)
+            post_failures.extend(failures)
+            return len(batch)
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                prod = prod_by_task[task]
+                error = task.exception()
+                if error is not None or task.result() is None:
+                    failed += 1
+                    record = prod.to_dict()
+                    if error is not None:
+                        print(f"❌ {prod.id} failed: {error!r}")
+                        record["error"] = repr(error)
+                    _write_jsonl(failed_file, [record])
+                    continue
+                product_data = task.result().to_dict()
+                translated += 1
+                _write_jsonl(translated_file, [product_data])
+                if post_url:
+                    to_post.append(product_data)
+
+            while len(to_post) >= batch_size:
+                batch, to_post = to_post[:batch_size], to_post[batch_size:]
+                posted += await post_batch(batch)
+                print(f"Posted {posted} EMAG products so far ({translated} translated).")
+
+        if to_post:
+            posted += await post_batch(to_post)
+
+    failed_to_post = sum(len(f["emag_product_data"]) for f in post_failures)
+    print(f"✅ {translated} products processed successfully, {failed} failed.")
+    if post_url:
+        print(
+            f"Successfully posted {posted - failed_to_post} EMAG products, "
+            f"{failed_to_post} failed."
+        )
+    _print_concurrency_report(limiter)
+    return {
+        "updated_emag_products": translated,
+        "failed_translations": failed,
+        "successful_creations": posted - failed_to_post,
+        "failed_products": post_failures,
+    }
+
+
 def create_romania_products_initial():
     # Step 1: Fetch all EMAG products
     emag_products_result, emag_products_fetched = fetch_all_emag_products(
@@ -486,6 +816,7 @@ def create_romania_products_initial():
             action="read",
         ),
         headers=const.EMAG_HEADERS,
+        concurrent=True,
     )
     if not emag_products_result:
         print("Failed to fetch EMAG products.")
@@ -550,25 +881,28 @@ def create_romania_products_initial():
     #     mapped_categories_strings, all_fitness_emag_categories
     # )
 
-    # # Get all existing EMAG product IDs (for generating a valid new ID if needed)
-    all_emag_product_ids = [product["id"] for product in emag_products_fetched]
+    # # Allocate ids for new products from the persistent per-marketplace sequence
+    id_allocator = ProductIdAllocator(
+        "ro", existing_ids=[product["id"] for product in emag_products_fetched]
+    )
+
+    # Index the related EMAG products by EAN once for constant-time lookups
+    emag_ean_index = util.build_emag_ean_index(fitness1_related_emag_products)
 
     # # Step 9: Create new EMAG products by merging data from Fitness1 with EMAG category info
     emag_products_created = []
     for fitness1_product in valid_fitness1_products:
         emag_product = util.create_emag_product_from_fitness1_product(fitness1_product)
-        if emag_product.ean in [
-            product["ean"][0] for product in fitness1_related_emag_products
-        ]:
+        if emag_product.ean in emag_ean_index:
             # get the id of the found product and set it to the emag product
             emag_product.id = util.get_emag_product_id_by_ean(
-                emag_product.ean, fitness1_related_emag_products
+                emag_product.ean, emag_ean_index
             )
             emag_product.part_number = util.get_emag_part_number_by_ean(
-                emag_product.ean, fitness1_related_emag_products
+                emag_product.ean, emag_ean_index
             )
         else:
-            emag_product.id = util.get_valid_emag_product_id(all_emag_product_ids)
+            emag_product.id = id_allocator.next_id()
         emag_product.category_id = fitness1_to_emag_id.get(
             fitness1_product.category, None
         )
@@ -581,12 +915,7 @@ def create_romania_products_initial():
         emag_product.name = name_str
         emag_product.description = name_str
         # Convert the price  from bgn to ron
-        from currency_converter import CurrencyConverter
-
-        c = CurrencyConverter()
-        emag_product.sale_price = round(
-            c.convert(emag_product.sale_price, "BGN", "RON"), 2
-        )
+        emag_product.sale_price = rates.convert(emag_product.sale_price, "RON")
         print(
             f"Converted price: {emag_product.sale_price} RON (from {fitness1_product.regular_price} BGN)"
         )
@@ -596,63 +925,34 @@ def create_romania_products_initial():
     print(
         f"Prepared {len(emag_products_created)} EMAG product objects for translation/characteristics."
     )
-    updated_emag_products: List[Dict]
-    failed_products: List[Dict]
-    updated_emag_products, failed_products = asyncio.run(
-        run_process_all(emag_products_created, all_emag_categories, lang="ro")
+    # Step 10: Translate the products and post them in batches as they complete
+    summary = asyncio.run(
+        run_process_and_post(
+            emag_products_created,
+            all_emag_categories,
+            lang="ro",
+            post_url=util.build_url(
+                base_url=const.EMAG_URL,
+                url_ext="ro",
+                resource="product_offer",
+                action="save",
+            ),
+            batch_size=50,
+            output_prefix="updated_emag_products",
+        )
     )
-    # save the translated products to a json file
-    with open("updated_emag_products.json", "w", encoding="utf-8") as f:
-        json.dump(updated_emag_products, f, ensure_ascii=False, indent=4)
-    print("Updated products saved to updated_emag_products.json")
-    # save the failed products to a json file
-    with open("failed_emag_products.json", "w", encoding="utf-8") as f:
-        json.dump(failed_products, f, ensure_ascii=False, indent=4)
-    print("Failed products saved to failed_emag_products.json")
+    print("Updated products saved to updated_emag_products.jsonl")
 
     print(f"Created {len(emag_products_created)} EMAG product objects.")
     print("example product:", emag_products_created[0])
     print("Example product data:", emag_products_created[0].to_dict())
 
-    # return {
-    #     "emag_products_fetched": len(emag_products_fetched),
-    #     "emag_products_created": len(emag_products_created),
-    #     "emag_products_updated": len(updated_emag_products),
-    #     "emag_products_failed": len(failed_products),
-    # }
-
-    # # # Step 10: Post the created EMAG products in batches
-    # # # Note: The post_emag_product function should already handle splitting into batches.
-    # products_data = [product.to_dict() for product in emag_products_created]
-    failed_products = post_emag_product(
-        emag_product_data=updated_emag_products,
-        api_url=util.build_url(
-            base_url=const.EMAG_URL,
-            url_ext="ro",
-            resource="product_offer",
-            action="save",
-        ),
-        headers=const.EMAG_HEADERS,
-        batch_size=50,
-    )
-
-    successful_count = len(updated_emag_products) - len(failed_products)
-    print(
-        f"Successfully posted {successful_count} EMAG products, {len(failed_products)} failed."
-    )
-    # save the failed posted products to a json file
-    with open("failed_posted_emag_products.json", "w", encoding="utf-8") as f:
-        json.dump(failed_products, f, ensure_ascii=False, indent=4)
-    print("Failed posted products saved to failed_posted_emag_products.json")
-
     # # # Instead of writing to a file, return a summary dictionary
     return {
         "emag_products_fetched": len(emag_products_fetched),
         "fitness1_products_fetched": len(fitness1_products),
         "emag_categories_fetched": len(all_emag_categories),
-        "updated_emag_products": len(updated_emag_products),
-        "successful_creations": successful_count,
-        "failed_products": failed_products,  # List of failed batch details
+        **summary,
     }
 
 
@@ -666,6 +966,7 @@ def create_hungarian_products_initial():
             action="read",
         ),
         headers=const.EMAG_HEADERS,
+        concurrent=True,
     )
     if not emag_products_result:
         print("Failed to fetch EMAG products.")
@@ -730,25 +1031,28 @@ def create_hungarian_products_initial():
     #     mapped_categories_strings, all_fitness_emag_categories
     # )
 
-    # # Get all existing EMAG product IDs (for generating a valid new ID if needed)
-    all_emag_product_ids = [product["id"] for product in emag_products_fetched]
+    # # Allocate ids for new products from the persistent per-marketplace sequence
+    id_allocator = ProductIdAllocator(
+        "hu", existing_ids=[product["id"] for product in emag_products_fetched]
+    )
+
+    # Index the related EMAG products by EAN once for constant-time lookups
+    emag_ean_index = util.build_emag_ean_index(fitness1_related_emag_products)
 
     # # Step 9: Create new EMAG products by merging data from Fitness1 with EMAG category info
     emag_products_created = []
     for fitness1_product in valid_fitness1_products:
         emag_product = util.create_emag_product_from_fitness1_product(fitness1_product)
-        if emag_product.ean in [
-            product["ean"][0] for product in fitness1_related_emag_products
-        ]:
+        if emag_product.ean in emag_ean_index:
             # get the id of the found product and set it to the emag product
             emag_product.id = util.get_emag_product_id_by_ean(
-                emag_product.ean, fitness1_related_emag_products
+                emag_product.ean, emag_ean_index
             )
             emag_product.part_number = util.get_emag_part_number_by_ean(
-                emag_product.ean, fitness1_related_emag_products
+                emag_product.ean, emag_ean_index
             )
         else:
-            emag_product.id = util.get_valid_emag_product_id(all_emag_product_ids)
+            emag_product.id = id_allocator.next_id()
         emag_product.category_id = fitness1_to_emag_id.get(
             fitness1_product.category, None
         )
@@ -761,12 +1065,7 @@ def create_hungarian_products_initial():
         emag_product.name = name_str
         emag_product.description = name_str
         # Convert the price  from bgn to HUF
-        from currency_converter import CurrencyConverter
-
-        c = CurrencyConverter()
-        emag_product.sale_price = round(
-            c.convert(emag_product.sale_price, "BGN", "HUF"), 2
-        )
+        emag_product.sale_price = rates.convert(emag_product.sale_price, "HUF")
         print(
             f"Converted price: {emag_product.sale_price} HUF (from {fitness1_product.regular_price} BGN)"
         )
@@ -776,21 +1075,17 @@ def create_hungarian_products_initial():
     print(
         f"Prepared {len(emag_products_created)} EMAG product objects for translation/characteristics."
     )
-    updated_emag_products: List[Dict]
-    failed_products: List[Dict]
-    updated_emag_products, failed_products = asyncio.run(
-        run_process_all(emag_products_created, all_emag_categories, lang="hu")
-    )
-    updated_emag_products = [p for p in updated_emag_products if p is not None]
-    failed_products = [p for p in failed_products if p is not None]
-    # save the translated products to a json file
-    with open("updated_emag_products_hu.json", "w", encoding="utf-8") as f:
-        json.dump(updated_emag_products, f, ensure_ascii=False, indent=4)
-    print("Updated products saved to updated_emag_products_hu.json")
-    # save the failed products to a json file
-    with open("failed_emag_products_hu.json", "w", encoding="utf-8") as f:
-        json.dump(failed_products, f, ensure_ascii=False, indent=4)
-    print("Failed products saved to failed_emag_products_hu.json")
+    # Translations are written to JSONL as they complete; posting to eMAG HU
+    # stays disabled (no post_url) until the HU listings are reviewed
+    summary = asyncio.run(
+        run_process_and_post(
+            emag_products_created,
+            all_emag_categories,
+            lang="hu",
+            output_prefix="updated_emag_products_hu",
+        )
+    )
+    print("Updated products saved to updated_emag_products_hu.jsonl")
 
     print(f"Created {len(emag_products_created)} EMAG product objects.")
     print("example product:", emag_products_created[0])
@@ -799,8 +1094,8 @@ def create_hungarian_products_initial():
     return {
         "emag_products_fetched": len(emag_products_fetched),
         "emag_products_created": len(emag_products_created),
-        "emag_products_updated": len(updated_emag_products),
-        "emag_products_failed": len(failed_products),
+        "emag_products_updated": summary["updated_emag_products"],
+        "emag_products_failed": summary["failed_translations"],
     }
 
     # # # Step 10: Post the created EMAG products in batches
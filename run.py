@@ -1,4 +1,15 @@
-from app import create_app
+import os
+
+from dotenv import load_dotenv
+
+# .env may still turn the scheduler off; load it before applying the default
+load_dotenv()
+# This is the server entry point, so its workers take part in running the
+# scheduled jobs (see SCHEDULER_ENABLED)
+if not os.environ.get("SCHEDULER_ENABLED"):
+    os.environ["SCHEDULER_ENABLED"] = "True"
+
+from app import create_app  # noqa: E402
 
 app = create_app()
 